@@ -1,3 +1,11 @@
+import concurrent.futures
+import functools
+import hmac
+import mmap
+import os
+import struct
+import time
+
 s_box = [0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
          0xca, 0x82, 0xc9, 0x7d, 0xfa, 0x59, 0x47, 0xf0, 0xad, 0xd4, 0xa2, 0xaf, 0x9c, 0xa4, 0x72, 0xc0,
          0xb7, 0xfd, 0x93, 0x26, 0x36, 0x3f, 0xf7, 0xcc, 0x34, 0xa5, 0xe5, 0xf1, 0x71, 0xd8, 0x31, 0x15,
@@ -15,6 +23,23 @@ s_box = [0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b,
          0xe1, 0xf8, 0x98, 0x11, 0x69, 0xd9, 0x8e, 0x94, 0x9b, 0x1e, 0x87, 0xe9, 0xce, 0x55, 0x28, 0xdf,
          0x8c, 0xa1, 0x89, 0x0d, 0xbf, 0xe6, 0x42, 0x68, 0x41, 0x99, 0x2d, 0x0f, 0xb0, 0x54, 0xbb, 0x16]
 
+inv_s_box = [0x52, 0x09, 0x6a, 0xd5, 0x30, 0x36, 0xa5, 0x38, 0xbf, 0x40, 0xa3, 0x9e, 0x81, 0xf3, 0xd7, 0xfb,
+             0x7c, 0xe3, 0x39, 0x82, 0x9b, 0x2f, 0xff, 0x87, 0x34, 0x8e, 0x43, 0x44, 0xc4, 0xde, 0xe9, 0xcb,
+             0x54, 0x7b, 0x94, 0x32, 0xa6, 0xc2, 0x23, 0x3d, 0xee, 0x4c, 0x95, 0x0b, 0x42, 0xfa, 0xc3, 0x4e,
+             0x08, 0x2e, 0xa1, 0x66, 0x28, 0xd9, 0x24, 0xb2, 0x76, 0x5b, 0xa2, 0x49, 0x6d, 0x8b, 0xd1, 0x25,
+             0x72, 0xf8, 0xf6, 0x64, 0x86, 0x68, 0x98, 0x16, 0xd4, 0xa4, 0x5c, 0xcc, 0x5d, 0x65, 0xb6, 0x92,
+             0x6c, 0x70, 0x48, 0x50, 0xfd, 0xed, 0xb9, 0xda, 0x5e, 0x15, 0x46, 0x57, 0xa7, 0x8d, 0x9d, 0x84,
+             0x90, 0xd8, 0xab, 0x00, 0x8c, 0xbc, 0xd3, 0x0a, 0xf7, 0xe4, 0x58, 0x05, 0xb8, 0xb3, 0x45, 0x06,
+             0xd0, 0x2c, 0x1e, 0x8f, 0xca, 0x3f, 0x0f, 0x02, 0xc1, 0xaf, 0xbd, 0x03, 0x01, 0x13, 0x8a, 0x6b,
+             0x3a, 0x91, 0x11, 0x41, 0x4f, 0x67, 0xdc, 0xea, 0x97, 0xf2, 0xcf, 0xce, 0xf0, 0xb4, 0xe6, 0x73,
+             0x96, 0xac, 0x74, 0x22, 0xe7, 0xad, 0x35, 0x85, 0xe2, 0xf9, 0x37, 0xe8, 0x1c, 0x75, 0xdf, 0x6e,
+             0x47, 0xf1, 0x1a, 0x71, 0x1d, 0x29, 0xc5, 0x89, 0x6f, 0xb7, 0x62, 0x0e, 0xaa, 0x18, 0xbe, 0x1b,
+             0xfc, 0x56, 0x3e, 0x4b, 0xc6, 0xd2, 0x79, 0x20, 0x9a, 0xdb, 0xc0, 0xfe, 0x78, 0xcd, 0x5a, 0xf4,
+             0x1f, 0xdd, 0xa8, 0x33, 0x88, 0x07, 0xc7, 0x31, 0xb1, 0x12, 0x10, 0x59, 0x27, 0x80, 0xec, 0x5f,
+             0x60, 0x51, 0x7f, 0xa9, 0x19, 0xb5, 0x4a, 0x0d, 0x2d, 0xe5, 0x7a, 0x9f, 0x93, 0xc9, 0x9c, 0xef,
+             0xa0, 0xe0, 0x3b, 0x4d, 0xae, 0x2a, 0xf5, 0xb0, 0xc8, 0xeb, 0xbb, 0x3c, 0x83, 0x53, 0x99, 0x61,
+             0x17, 0x2b, 0x04, 0x7e, 0xba, 0x77, 0xd6, 0x26, 0xe1, 0x69, 0x14, 0x63, 0x55, 0x21, 0x0c, 0x7d]
+
 def byte_substitution(state):
     """ 
     Layer that performs byte substitution with the S-box lookup table.
@@ -202,23 +227,6 @@ def inv_byte_substitution(state):
     Returns:
     - Result after inverted byte substitution
     """
-    inv_s_box = [0x52, 0x09, 0x6a, 0xd5, 0x30, 0x36, 0xa5, 0x38, 0xbf, 0x40, 0xa3, 0x9e, 0x81, 0xf3, 0xd7, 0xfb,
-                 0x7c, 0xe3, 0x39, 0x82, 0x9b, 0x2f, 0xff, 0x87, 0x34, 0x8e, 0x43, 0x44, 0xc4, 0xde, 0xe9, 0xcb,
-                 0x54, 0x7b, 0x94, 0x32, 0xa6, 0xc2, 0x23, 0x3d, 0xee, 0x4c, 0x95, 0x0b, 0x42, 0xfa, 0xc3, 0x4e,
-                 0x08, 0x2e, 0xa1, 0x66, 0x28, 0xd9, 0x24, 0xb2, 0x76, 0x5b, 0xa2, 0x49, 0x6d, 0x8b, 0xd1, 0x25,
-                 0x72, 0xf8, 0xf6, 0x64, 0x86, 0x68, 0x98, 0x16, 0xd4, 0xa4, 0x5c, 0xcc, 0x5d, 0x65, 0xb6, 0x92,
-                 0x6c, 0x70, 0x48, 0x50, 0xfd, 0xed, 0xb9, 0xda, 0x5e, 0x15, 0x46, 0x57, 0xa7, 0x8d, 0x9d, 0x84,
-                 0x90, 0xd8, 0xab, 0x00, 0x8c, 0xbc, 0xd3, 0x0a, 0xf7, 0xe4, 0x58, 0x05, 0xb8, 0xb3, 0x45, 0x06,
-                 0xd0, 0x2c, 0x1e, 0x8f, 0xca, 0x3f, 0x0f, 0x02, 0xc1, 0xaf, 0xbd, 0x03, 0x01, 0x13, 0x8a, 0x6b,
-                 0x3a, 0x91, 0x11, 0x41, 0x4f, 0x67, 0xdc, 0xea, 0x97, 0xf2, 0xcf, 0xce, 0xf0, 0xb4, 0xe6, 0x73,
-                 0x96, 0xac, 0x74, 0x22, 0xe7, 0xad, 0x35, 0x85, 0xe2, 0xf9, 0x37, 0xe8, 0x1c, 0x75, 0xdf, 0x6e,
-                 0x47, 0xf1, 0x1a, 0x71, 0x1d, 0x29, 0xc5, 0x89, 0x6f, 0xb7, 0x62, 0x0e, 0xaa, 0x18, 0xbe, 0x1b,
-                 0xfc, 0x56, 0x3e, 0x4b, 0xc6, 0xd2, 0x79, 0x20, 0x9a, 0xdb, 0xc0, 0xfe, 0x78, 0xcd, 0x5a, 0xf4,
-                 0x1f, 0xdd, 0xa8, 0x33, 0x88, 0x07, 0xc7, 0x31, 0xb1, 0x12, 0x10, 0x59, 0x27, 0x80, 0xec, 0x5f,
-                 0x60, 0x51, 0x7f, 0xa9, 0x19, 0xb5, 0x4a, 0x0d, 0x2d, 0xe5, 0x7a, 0x9f, 0x93, 0xc9, 0x9c, 0xef,
-                 0xa0, 0xe0, 0x38, 0x4d, 0xae, 0x2a, 0xf5, 0xb0, 0xc8, 0xeb, 0xbb, 0x3c, 0x83, 0x53, 0x99, 0x61,
-                 0x17, 0x2b, 0x04, 0x7e, 0xba, 0x77, 0xd6, 0x26, 0xe1, 0x69, 0x14, 0x63, 0x55, 0x21, 0x0c, 0x7d]
-    
     return [inv_s_box[byte] for byte in state]
 
 def decryption_key_schedule(key):
@@ -243,7 +251,7 @@ def aes_encryption(plaintext, round_key):
     
     Parameters:
     - plaintext: the input message to be encrypted
-    - key: the key to be used when encrypting the message
+    - key: the key (or AESKey) to be used when encrypting the message
 
     Raises:
     - ValueError: Raises the exception if the value is not the correct length
@@ -251,21 +259,10 @@ def aes_encryption(plaintext, round_key):
     Returns:
     - The encrypted ciphertext.
     """  
-    key_len = len(round_key)
-    rounds = 0
-
-    # Check the key length
-    if key_len == 16:
-        rounds = 10
-    elif key_len == 24:
-        rounds = 12
-    elif key_len == 32:
-        rounds = 14
-    else:
-        raise ValueError("Invalid key length. Key must be 128-bit, 192-bit, or 256-bit.")
-    
-    # Generate the round keys
-    round_keys = key_schedule(round_key)
+    # Get the round keys, the key schedule only runs the first time a key is used
+    aes_key = get_aes_key(round_key)
+    rounds = aes_key.rounds
+    round_keys = aes_key.round_keys
 
     # Initial key addition
     state = key_addition(plaintext, round_keys[0])
@@ -298,7 +295,7 @@ def aes_decryption(ciphertext, key):
 
     Parameters:
     - ciphertext: the inputed ciphertext to be decrypted
-    - key: the key to be used when decrypting the message
+    - key: the key (or AESKey) to be used when decrypting the message
 
     Raises:
     - ValueError: Raises the exception if the value is not the correct length
@@ -306,21 +303,10 @@ def aes_decryption(ciphertext, key):
     Returns:
     - The decrypted message
     """
-    key_len = len(key)
-    rounds = 0
-
-    # Check the key length
-    if key_len == 16:
-        rounds = 10
-    elif key_len == 24:
-        rounds = 12
-    elif key_len == 32:
-        rounds = 14
-    else:
-        raise ValueError("Invalid key length. Key must be 128-bit, 192-bit, or 256-bit.")
-    
-    # Generate the round keys
-    round_keys = decryption_key_schedule(key)
+    # Get the round keys, the key schedule only runs the first time a key is used
+    aes_key = get_aes_key(key)
+    rounds = aes_key.rounds
+    round_keys = aes_key.decryption_round_keys
 
     # Initial key addition
     state = key_addition(ciphertext, round_keys[0])
@@ -346,7 +332,1339 @@ def aes_decryption(ciphertext, key):
     state = key_addition(state, round_keys[-1])
 
     return state
-         
+
+
+# T-table engine: the same cipher as aes_encryption/aes_decryption, but the state is kept as
+# four 32-bit column words and SubBytes, ShiftRows and MixColumns are folded into table lookups.
+def build_t_table(sbox, column):
+    """
+    Builds a T-table that combines the S-box lookup with one column of the MixColumns matrix.
+
+    Parameters:
+    - sbox: the S-box (or inverted S-box) to substitute the byte with
+    - column: the four matrix coefficients of the column, from the top row to the bottom row
+
+    Returns:
+    - A list of 256 32-bit words, one for each possible input byte
+    """
+    table = []
+    for byte in range(256):
+        value = sbox[byte]
+        word = 0
+        for coefficient in column:
+            word = (word << 8) | gf_multiply(coefficient, value)
+        table.append(word)
+    return table
+
+# Each table is the previous one rotated by one row, just like the columns of the matrices.
+te0 = build_t_table(s_box, [0x02, 0x01, 0x01, 0x03])
+te1 = build_t_table(s_box, [0x03, 0x02, 0x01, 0x01])
+te2 = build_t_table(s_box, [0x01, 0x03, 0x02, 0x01])
+te3 = build_t_table(s_box, [0x01, 0x01, 0x03, 0x02])
+
+td0 = build_t_table(inv_s_box, [0x0e, 0x09, 0x0d, 0x0b])
+td1 = build_t_table(inv_s_box, [0x0b, 0x0e, 0x09, 0x0d])
+td2 = build_t_table(inv_s_box, [0x0d, 0x0b, 0x0e, 0x09])
+td3 = build_t_table(inv_s_box, [0x09, 0x0d, 0x0b, 0x0e])
+
+def state_to_words(state):
+    """
+    Packs a 16-byte state into four 32-bit column words.
+
+    Parameters:
+    - state: current state of the data as a list of 16 bytes
+
+    Returns:
+    - A list with the four column words
+    """
+    return [(state[i] << 24) | (state[i + 1] << 16) | (state[i + 2] << 8) | state[i + 3] for i in range(0, 16, 4)]
+
+def words_to_state(words):
+    """
+    Unpacks four 32-bit column words into a 16-byte state.
+
+    Parameters:
+    - words: the four column words
+
+    Returns:
+    - The state of the data as a list of 16 bytes
+    """
+    state = []
+    for word in words:
+        state.extend([word >> 24, (word >> 16) & 0xff, (word >> 8) & 0xff, word & 0xff])
+    return state
+
+def ttable_round_words(round_keys, rounds):
+    """
+    Converts the round keys from key_schedule into the column words used by the T-table engine.
+
+    Parameters:
+    - round_keys: the list of round keys for encryption
+    - rounds: the number of rounds
+
+    Returns:
+    - The encryption round words and the decryption round words
+    """
+    # key_addition only ever uses the first 16 bytes of each round key.
+    byte_round_keys = [round_key[:16] for round_key in round_keys]
+    word_round_keys = [state_to_words(round_key) for round_key in byte_round_keys]
+
+    encryption_words = []
+    for words in word_round_keys:
+        encryption_words.extend(words)
+
+    # Decryption uses the keys in the order of aes_decryption. Inverse mix columns comes after the
+    # key addition there, so the keys of those rounds are passed through inverse mix columns as well.
+    decryption_words = list(word_round_keys[rounds])
+    for i in range(1, rounds - 1):
+        decryption_words.extend(state_to_words(inv_mix_columns(byte_round_keys[i])))
+    decryption_words.extend(word_round_keys[rounds - 1])
+    decryption_words.extend(word_round_keys[0])
+
+    return encryption_words, decryption_words
+
+def equivalent_inverse_round_words(round_keys, rounds):
+    """
+    Converts the round keys from key_schedule into the round words of the equivalent inverse cipher.
+    The keys of the rounds that undo mix columns are passed through inverse mix columns once here,
+    so decryption rounds have the same shape as encryption rounds.
+
+    Parameters:
+    - round_keys: the list of round keys for encryption
+    - rounds: the number of rounds
+
+    Returns:
+    - The round words in the order they are used by equivalent_inverse_words
+    """
+    byte_round_keys = [round_key[:16] for round_key in round_keys]
+
+    inverse_words = state_to_words(byte_round_keys[rounds]) + state_to_words(byte_round_keys[rounds - 1])
+    for i in range(rounds - 2, 0, -1):
+        inverse_words.extend(state_to_words(inv_mix_columns(byte_round_keys[i])))
+    inverse_words.extend(state_to_words(byte_round_keys[0]))
+
+    return inverse_words
+
+def ttable_encrypt_words(s0, s1, s2, s3, round_words, rounds):
+    """
+    Encrypts one block given as column words with the T-table engine.
+
+    Parameters:
+    - s0, s1, s2, s3: the four column words of the block
+    - round_words: the encryption round words from ttable_round_words
+    - rounds: the number of rounds
+
+    Returns:
+    - The four column words of the encrypted block
+    """
+    s0 ^= round_words[0]
+    s1 ^= round_words[1]
+    s2 ^= round_words[2]
+    s3 ^= round_words[3]
+
+    # Rounds with byte substitution, shift rows, mix columns and key addition
+    k = 4
+    for _ in range(rounds - 2):
+        t0 = te0[s0 >> 24] ^ te1[s1 >> 24] ^ te2[s2 >> 24] ^ te3[s3 >> 24] ^ round_words[k]
+        t1 = te0[(s1 >> 16) & 0xff] ^ te1[(s2 >> 16) & 0xff] ^ te2[(s3 >> 16) & 0xff] ^ te3[(s0 >> 16) & 0xff] ^ round_words[k + 1]
+        t2 = te0[(s2 >> 8) & 0xff] ^ te1[(s3 >> 8) & 0xff] ^ te2[(s0 >> 8) & 0xff] ^ te3[(s1 >> 8) & 0xff] ^ round_words[k + 2]
+        t3 = te0[s3 & 0xff] ^ te1[s0 & 0xff] ^ te2[s1 & 0xff] ^ te3[s2 & 0xff] ^ round_words[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    # The last two rounds of aes_encryption skip mix columns
+    for _ in range(2):
+        t0 = ((s_box[s0 >> 24] << 24) | (s_box[s1 >> 24] << 16) | (s_box[s2 >> 24] << 8) | s_box[s3 >> 24]) ^ round_words[k]
+        t1 = ((s_box[(s1 >> 16) & 0xff] << 24) | (s_box[(s2 >> 16) & 0xff] << 16) | (s_box[(s3 >> 16) & 0xff] << 8) | s_box[(s0 >> 16) & 0xff]) ^ round_words[k + 1]
+        t2 = ((s_box[(s2 >> 8) & 0xff] << 24) | (s_box[(s3 >> 8) & 0xff] << 16) | (s_box[(s0 >> 8) & 0xff] << 8) | s_box[(s1 >> 8) & 0xff]) ^ round_words[k + 2]
+        t3 = ((s_box[s3 & 0xff] << 24) | (s_box[s0 & 0xff] << 16) | (s_box[s1 & 0xff] << 8) | s_box[s2 & 0xff]) ^ round_words[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    return s0, s1, s2, s3
+
+def ttable_decrypt_words(s0, s1, s2, s3, round_words, rounds):
+    """
+    Decrypts one block given as column words with the T-table engine.
+
+    Parameters:
+    - s0, s1, s2, s3: the four column words of the block
+    - round_words: the decryption round words from ttable_round_words
+    - rounds: the number of rounds
+
+    Returns:
+    - The four column words of the decrypted block
+    """
+    s0 ^= round_words[0]
+    s1 ^= round_words[1]
+    s2 ^= round_words[2]
+    s3 ^= round_words[3]
+
+    # Rounds with inverse shift rows, inverse byte substitution, key addition and inverse mix columns
+    k = 4
+    for _ in range(rounds - 2):
+        t0 = td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xff] ^ td2[(s2 >> 8) & 0xff] ^ td3[s1 & 0xff] ^ round_words[k]
+        t1 = td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xff] ^ td2[(s3 >> 8) & 0xff] ^ td3[s2 & 0xff] ^ round_words[k + 1]
+        t2 = td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xff] ^ td2[(s0 >> 8) & 0xff] ^ td3[s3 & 0xff] ^ round_words[k + 2]
+        t3 = td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xff] ^ td2[(s1 >> 8) & 0xff] ^ td3[s0 & 0xff] ^ round_words[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    # The last two rounds of aes_decryption skip inverse mix columns
+    for _ in range(2):
+        t0 = ((inv_s_box[s0 >> 24] << 24) | (inv_s_box[(s3 >> 16) & 0xff] << 16) | (inv_s_box[(s2 >> 8) & 0xff] << 8) | inv_s_box[s1 & 0xff]) ^ round_words[k]
+        t1 = ((inv_s_box[s1 >> 24] << 24) | (inv_s_box[(s0 >> 16) & 0xff] << 16) | (inv_s_box[(s3 >> 8) & 0xff] << 8) | inv_s_box[s2 & 0xff]) ^ round_words[k + 1]
+        t2 = ((inv_s_box[s2 >> 24] << 24) | (inv_s_box[(s1 >> 16) & 0xff] << 16) | (inv_s_box[(s0 >> 8) & 0xff] << 8) | inv_s_box[s3 & 0xff]) ^ round_words[k + 2]
+        t3 = ((inv_s_box[s3 >> 24] << 24) | (inv_s_box[(s2 >> 16) & 0xff] << 16) | (inv_s_box[(s1 >> 8) & 0xff] << 8) | inv_s_box[s0 & 0xff]) ^ round_words[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    return s0, s1, s2, s3
+
+def equivalent_inverse_words(s0, s1, s2, s3, round_words, rounds):
+    """
+    Decrypts one block given as column words with the equivalent inverse cipher, which undoes
+    ttable_encrypt_words (and aes_encryption) round by round with the td tables.
+
+    Parameters:
+    - s0, s1, s2, s3: the four column words of the block
+    - round_words: the round words from equivalent_inverse_round_words
+    - rounds: the number of rounds
+
+    Returns:
+    - The four column words of the decrypted block
+    """
+    s0 ^= round_words[0]
+    s1 ^= round_words[1]
+    s2 ^= round_words[2]
+    s3 ^= round_words[3]
+
+    # Undo the last round, which has no mix columns
+    t0 = ((inv_s_box[s0 >> 24] << 24) | (inv_s_box[s1 & 0xff] << 16) | (inv_s_box[(s2 >> 8) & 0xff] << 8) | inv_s_box[(s3 >> 16) & 0xff]) ^ round_words[4]
+    t1 = ((inv_s_box[(s0 >> 16) & 0xff] << 24) | (inv_s_box[s1 >> 24] << 16) | (inv_s_box[s2 & 0xff] << 8) | inv_s_box[(s3 >> 8) & 0xff]) ^ round_words[5]
+    t2 = ((inv_s_box[(s0 >> 8) & 0xff] << 24) | (inv_s_box[(s1 >> 16) & 0xff] << 16) | (inv_s_box[s2 >> 24] << 8) | inv_s_box[s3 & 0xff]) ^ round_words[6]
+    t3 = ((inv_s_box[s0 & 0xff] << 24) | (inv_s_box[(s1 >> 8) & 0xff] << 16) | (inv_s_box[(s2 >> 16) & 0xff] << 8) | inv_s_box[s3 >> 24]) ^ round_words[7]
+    s0, s1, s2, s3 = t0, t1, t2, t3
+
+    # Undo the rounds in reverse, the inverse of shift_rows, inverse byte substitution and inverse
+    # mix columns are all in the td tables and the keys were already passed through inverse mix columns
+    k = 8
+    for _ in range(rounds - 2):
+        t0 = td0[s0 >> 24] ^ td1[s1 & 0xff] ^ td2[(s2 >> 8) & 0xff] ^ td3[(s3 >> 16) & 0xff] ^ round_words[k]
+        t1 = td0[(s0 >> 16) & 0xff] ^ td1[s1 >> 24] ^ td2[s2 & 0xff] ^ td3[(s3 >> 8) & 0xff] ^ round_words[k + 1]
+        t2 = td0[(s0 >> 8) & 0xff] ^ td1[(s1 >> 16) & 0xff] ^ td2[s2 >> 24] ^ td3[s3 & 0xff] ^ round_words[k + 2]
+        t3 = td0[s0 & 0xff] ^ td1[(s1 >> 8) & 0xff] ^ td2[(s2 >> 16) & 0xff] ^ td3[s3 >> 24] ^ round_words[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    # Undo the first round
+    t0 = ((inv_s_box[s0 >> 24] << 24) | (inv_s_box[s1 & 0xff] << 16) | (inv_s_box[(s2 >> 8) & 0xff] << 8) | inv_s_box[(s3 >> 16) & 0xff]) ^ round_words[k]
+    t1 = ((inv_s_box[(s0 >> 16) & 0xff] << 24) | (inv_s_box[s1 >> 24] << 16) | (inv_s_box[s2 & 0xff] << 8) | inv_s_box[(s3 >> 8) & 0xff]) ^ round_words[k + 1]
+    t2 = ((inv_s_box[(s0 >> 8) & 0xff] << 24) | (inv_s_box[(s1 >> 16) & 0xff] << 16) | (inv_s_box[s2 >> 24] << 8) | inv_s_box[s3 & 0xff]) ^ round_words[k + 2]
+    t3 = ((inv_s_box[s0 & 0xff] << 24) | (inv_s_box[(s1 >> 8) & 0xff] << 16) | (inv_s_box[(s2 >> 16) & 0xff] << 8) | inv_s_box[s3 >> 24]) ^ round_words[k + 3]
+
+    return t0, t1, t2, t3
+
+def ttable_aes_encryption(plaintext, key):
+    """
+    Performs the AES algorithm with the T-table engine to encrypt the plaintext using the provided key.
+    The output is identical to aes_encryption.
+
+    Parameters:
+    - plaintext: the input message to be encrypted
+    - key: the key (or AESKey) to be used when encrypting the message
+
+    Raises:
+    - ValueError: Raises the exception if the value is not the correct length
+
+    Returns:
+    - The encrypted ciphertext.
+    """
+    aes_key = get_aes_key(key)
+    return words_to_state(ttable_encrypt_words(*state_to_words(plaintext), aes_key.encryption_words, aes_key.rounds))
+
+def ttable_aes_decryption(ciphertext, key):
+    """
+    Performs the AES algorithm with the T-table engine to decrypt the ciphertext using the provided key.
+    The output is identical to aes_decryption.
+
+    Parameters:
+    - ciphertext: the inputed ciphertext to be decrypted
+    - key: the key (or AESKey) to be used when decrypting the message
+
+    Raises:
+    - ValueError: Raises the exception if the value is not the correct length
+
+    Returns:
+    - The decrypted message
+    """
+    aes_key = get_aes_key(key)
+    return words_to_state(ttable_decrypt_words(*state_to_words(ciphertext), aes_key.decryption_words, aes_key.rounds))
+
+def equivalent_inverse_decryption(ciphertext, key):
+    """
+    Decrypts a ciphertext produced by aes_encryption with the equivalent inverse cipher. Unlike
+    aes_decryption, which applies its layers in a different order, this undoes aes_encryption exactly.
+
+    Parameters:
+    - ciphertext: the inputed ciphertext to be decrypted
+    - key: the key (or AESKey) to be used when decrypting the message
+
+    Raises:
+    - ValueError: Raises the exception if the value is not the correct length
+
+    Returns:
+    - The decrypted message
+    """
+    aes_key = get_aes_key(key)
+    return words_to_state(equivalent_inverse_words(*state_to_words(ciphertext), aes_key.inverse_words, aes_key.rounds))
+
+class AESKey:
+    """
+    Holds everything derived from a master key, so the key schedule only runs once per key.
+
+    Parameters:
+    - key: the 128-bit master key, the only size the key schedule supports
+
+    Raises:
+    - ValueError: Raises the exception if the key is not 128-bit
+    """
+    def __init__(self, key):
+        # The key schedule only has the round constants of the 10-round, 128-bit schedule
+        if len(key) != 16:
+            raise ValueError("Invalid key length. Key must be 128-bit.")
+        self.rounds = 10
+
+        self.master_key = tuple(key)
+
+        # Round keys for the reference path
+        self.round_keys = key_schedule(list(key))
+        self.decryption_round_keys = self.round_keys[::-1]
+
+        # Round words for the T-table engine
+        self.encryption_words, self.decryption_words = ttable_round_words(self.round_keys, self.rounds)
+        self.inverse_words = equivalent_inverse_round_words(self.round_keys, self.rounds)
+
+        # GHASH tables, built by get_ghash_tables the first time GCM uses this key
+        self.ghash_tables = None
+
+        # Round keys for the NumPy backend, built by numpy_round_keys the first time they are needed
+        self.numpy_round_keys = None
+
+# Maximum number of expanded keys kept in memory by get_aes_key.
+aes_key_cache_size = 4096
+
+@functools.lru_cache(maxsize=aes_key_cache_size)
+def cached_aes_key(master_key):
+    """
+    Expands a master key, keeping the most recently used expanded keys in a bounded LRU cache.
+
+    Parameters:
+    - master_key: the master key as a tuple of bytes
+
+    Returns:
+    - The AESKey for the master key
+    """
+    return AESKey(master_key)
+
+def get_aes_key(key):
+    """
+    Returns the expanded key for a master key, expanding it only if it is not in the cache.
+
+    Parameters:
+    - key: the master key, or an AESKey which is returned as it is
+
+    Raises:
+    - ValueError: Raises the exception if the value is not the correct length
+
+    Returns:
+    - The AESKey for the master key
+    """
+    if isinstance(key, AESKey):
+        return key
+    return cached_aes_key(tuple(key))
+
+def aes_key_cache_stats():
+    """
+    Reports how well the expanded key cache is doing.
+
+    Returns:
+    - A dictionary with the hits, misses, current size, maximum size and hit rate of the cache
+    """
+    info = cached_aes_key.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+# A 16-byte block read or written as its four big-endian column words.
+block_struct = struct.Struct(">4I")
+
+def process_blocks(buf, out, block_function, round_words, rounds):
+    """
+    Runs a T-table block function over every 16-byte block of a buffer.
+
+    Parameters:
+    - buf: any bytes-like object holding a multiple of 16 bytes
+    - out: a writable bytes-like object of the same length, or None to allocate a bytearray
+    - block_function: ttable_encrypt_words, ttable_decrypt_words or equivalent_inverse_words
+    - round_words: the round words for the block function
+    - rounds: the number of rounds
+
+    Raises:
+    - ValueError: Raises the exception if the buffers have the wrong length
+
+    Returns:
+    - The output buffer
+    """
+    source = memoryview(buf).cast("B")
+    length = len(source)
+    if length % 16:
+        raise ValueError("Invalid buffer length. The buffer must hold a whole number of 16-byte blocks.")
+
+    if out is None:
+        out = bytearray(length)
+    destination = memoryview(out).cast("B")
+    if len(destination) != length:
+        raise ValueError("Invalid output length. The output must be the same length as the input.")
+
+    unpack_from = block_struct.unpack_from
+    pack_into = block_struct.pack_into
+    for offset in range(0, length, 16):
+        pack_into(destination, offset, *block_function(*unpack_from(source, offset), round_words, rounds))
+
+    return out
+
+def encrypt_blocks(key, buf, out=None):
+    """
+    Encrypts every 16-byte block of a buffer with the T-table engine, the same as calling
+    aes_encryption on each block.
+
+    Parameters:
+    - key: the key (or AESKey) to be used when encrypting the blocks
+    - buf: any bytes-like object (bytes, bytearray, memoryview...) holding N x 16 bytes
+    - out: optional bytearray or memoryview of the same length to write the ciphertext into,
+      it may be the input buffer itself
+
+    Raises:
+    - ValueError: Raises the exception if the key or the buffers have the wrong length
+
+    Returns:
+    - The buffer holding the ciphertext, which is out when it is given
+    """
+    aes_key = get_aes_key(key)
+    return process_blocks(buf, out, ttable_encrypt_words, aes_key.encryption_words, aes_key.rounds)
+
+def decrypt_blocks(key, buf, out=None):
+    """
+    Decrypts every 16-byte block of a buffer with the equivalent inverse cipher, undoing encrypt_blocks.
+
+    Parameters:
+    - key: the key (or AESKey) to be used when decrypting the blocks
+    - buf: any bytes-like object (bytes, bytearray, memoryview...) holding N x 16 bytes
+    - out: optional bytearray or memoryview of the same length to write the plaintext into,
+      it may be the input buffer itself
+
+    Raises:
+    - ValueError: Raises the exception if the key or the buffers have the wrong length
+
+    Returns:
+    - The buffer holding the plaintext, which is out when it is given
+    """
+    aes_key = get_aes_key(key)
+    return process_blocks(buf, out, equivalent_inverse_words, aes_key.inverse_words, aes_key.rounds)
+
+# Tables for the NumPy backend, filled by load_numpy_tables the first time it is used so that
+# NumPy is only needed by code that calls the NumPy functions.
+numpy_tables = {}
+
+def load_numpy_tables():
+    """
+    Imports NumPy and builds the lookup tables of the NumPy backend.
+
+    Raises:
+    - ImportError: Raises the exception if NumPy is not installed
+
+    Returns:
+    - A dictionary with the numpy module and the tables as uint8 arrays
+    """
+    if not numpy_tables:
+        import numpy
+
+        shift_permutation = shift_rows(list(range(16)))
+        inv_shift_permutation = [0] * 16
+        for position, source in enumerate(shift_permutation):
+            inv_shift_permutation[source] = position
+
+        def multiplication_table(factor):
+            return numpy.array([gf_multiply(factor, byte) for byte in range(256)], dtype=numpy.uint8)
+
+        numpy_tables.update({
+            "numpy": numpy,
+            "s_box": numpy.array(s_box, dtype=numpy.uint8),
+            "inv_s_box": numpy.array(inv_s_box, dtype=numpy.uint8),
+            "shift_rows": numpy.array(shift_permutation),
+            "inv_shift_rows": numpy.array(inv_shift_permutation),
+            "xtime": multiplication_table(0x02),
+            "mul9": multiplication_table(0x09),
+            "mul11": multiplication_table(0x0b),
+            "mul13": multiplication_table(0x0d),
+            "mul14": multiplication_table(0x0e),
+        })
+    return numpy_tables
+
+def numpy_round_keys(aes_key):
+    """
+    Returns the round keys of a key as a uint8 array, building it the first time it is needed.
+
+    Parameters:
+    - aes_key: the AESKey
+
+    Returns:
+    - An array of shape (rounds + 1, 16) with the round keys
+    """
+    if aes_key.numpy_round_keys is None:
+        numpy = load_numpy_tables()["numpy"]
+        # key_addition only ever uses the first 16 bytes of each round key.
+        aes_key.numpy_round_keys = numpy.array([round_key[:16] for round_key in aes_key.round_keys], dtype=numpy.uint8)
+    return aes_key.numpy_round_keys
+
+def numpy_blocks(blocks):
+    """
+    Checks that the blocks are an (N, 16) array of bytes.
+
+    Parameters:
+    - blocks: an array-like object of shape (N, 16) with values from 0 to 255
+
+    Raises:
+    - ValueError: Raises the exception if the blocks have the wrong shape
+
+    Returns:
+    - The blocks as a uint8 array
+    """
+    numpy = load_numpy_tables()["numpy"]
+    blocks = numpy.asarray(blocks, dtype=numpy.uint8)
+    if blocks.ndim != 2 or blocks.shape[1] != 16:
+        raise ValueError("Invalid block shape. The blocks must be an (N, 16) array.")
+    return blocks
+
+def numpy_aes_encryption(blocks, key):
+    """
+    Encrypts many blocks at once with NumPy, each row gives the same result as aes_encryption.
+
+    Parameters:
+    - blocks: an (N, 16) uint8 array with one block per row
+    - key: the key (or AESKey) to be used when encrypting the blocks
+
+    Raises:
+    - ImportError: Raises the exception if NumPy is not installed
+    - ValueError: Raises the exception if the key or the blocks have the wrong size
+
+    Returns:
+    - An (N, 16) uint8 array with the encrypted blocks
+    """
+    tables = load_numpy_tables()
+    sbox = tables["s_box"]
+    permutation = tables["shift_rows"]
+    xtime = tables["xtime"]
+    aes_key = get_aes_key(key)
+    round_keys = numpy_round_keys(aes_key)
+
+    # Initial key addition
+    state = numpy_blocks(blocks) ^ round_keys[0]
+
+    for i in range(1, aes_key.rounds + 1):
+        # Byte substitution and shift rows
+        state = sbox[state][:, permutation]
+
+        # Mix columns (except for the last two rounds, as in aes_encryption)
+        if i < aes_key.rounds - 1:
+            columns = state.reshape(-1, 4, 4)
+            doubled = xtime[columns]
+            a0, a1, a2, a3 = (columns[:, :, row] for row in range(4))
+            d0, d1, d2, d3 = (doubled[:, :, row] for row in range(4))
+            mixed = tables["numpy"].empty_like(columns)
+            mixed[:, :, 0] = d0 ^ d1 ^ a1 ^ a2 ^ a3
+            mixed[:, :, 1] = a0 ^ d1 ^ d2 ^ a2 ^ a3
+            mixed[:, :, 2] = a0 ^ a1 ^ d2 ^ d3 ^ a3
+            mixed[:, :, 3] = d0 ^ a0 ^ a1 ^ a2 ^ d3
+            state = mixed.reshape(-1, 16)
+
+        # Key addition
+        state ^= round_keys[i]
+
+    return state
+
+def numpy_aes_decryption(blocks, key):
+    """
+    Decrypts many blocks at once with NumPy, undoing numpy_aes_encryption (and aes_encryption) the
+    same way as equivalent_inverse_decryption.
+
+    Parameters:
+    - blocks: an (N, 16) uint8 array with one block per row
+    - key: the key (or AESKey) to be used when decrypting the blocks
+
+    Raises:
+    - ImportError: Raises the exception if NumPy is not installed
+    - ValueError: Raises the exception if the key or the blocks have the wrong size
+
+    Returns:
+    - An (N, 16) uint8 array with the decrypted blocks
+    """
+    tables = load_numpy_tables()
+    inv_sbox = tables["inv_s_box"]
+    permutation = tables["inv_shift_rows"]
+    mul9, mul11, mul13, mul14 = tables["mul9"], tables["mul11"], tables["mul13"], tables["mul14"]
+    aes_key = get_aes_key(key)
+    round_keys = numpy_round_keys(aes_key)
+
+    state = numpy_blocks(blocks) ^ round_keys[aes_key.rounds]
+
+    for i in range(aes_key.rounds - 1, -1, -1):
+        # Inverse shift rows and inverse byte substitution
+        state = inv_sbox[state[:, permutation]]
+
+        # Key addition
+        state ^= round_keys[i]
+
+        # Inverse mix columns for the rounds that mixed the columns
+        if 1 <= i < aes_key.rounds - 1:
+            columns = state.reshape(-1, 4, 4)
+            a0, a1, a2, a3 = (columns[:, :, row] for row in range(4))
+            mixed = tables["numpy"].empty_like(columns)
+            mixed[:, :, 0] = mul14[a0] ^ mul11[a1] ^ mul13[a2] ^ mul9[a3]
+            mixed[:, :, 1] = mul9[a0] ^ mul14[a1] ^ mul11[a2] ^ mul13[a3]
+            mixed[:, :, 2] = mul13[a0] ^ mul9[a1] ^ mul14[a2] ^ mul11[a3]
+            mixed[:, :, 3] = mul11[a0] ^ mul13[a1] ^ mul9[a2] ^ mul14[a3]
+            state = mixed.reshape(-1, 16)
+
+    return state
+
+def xor_bytes(data, keystream):
+    """
+    XORs the data with the start of the keystream.
+
+    Parameters:
+    - data: the bytes-like data
+    - keystream: a bytes-like keystream at least as long as the data
+
+    Returns:
+    - The XOR of the data and the keystream as bytes
+    """
+    length = len(data)
+    return (int.from_bytes(data, "big") ^ int.from_bytes(keystream[:length], "big")).to_bytes(length, "big")
+
+def ctr_keystream(key, counter, block_count, counter_bits=128):
+    """
+    Generates the CTR keystream by encrypting consecutive counter blocks.
+
+    Parameters:
+    - key: the key (or AESKey) to be used when encrypting the counter blocks
+    - counter: the first counter block as a 128-bit integer
+    - block_count: the number of keystream blocks to generate
+    - counter_bits: how many of the low bits of the counter block are incremented, they wrap around
+      without carrying into the rest of the block (128 by default, GCM uses 32)
+
+    Returns:
+    - A bytearray with 16 x block_count bytes of keystream
+    """
+    aes_key = get_aes_key(key)
+    round_words = aes_key.encryption_words
+    rounds = aes_key.rounds
+    pack_into = block_struct.pack_into
+    mask = (1 << counter_bits) - 1
+    prefix = counter & ~mask
+
+    keystream = bytearray(16 * block_count)
+    for i in range(block_count):
+        value = prefix | ((counter + i) & mask)
+        pack_into(keystream, 16 * i, *ttable_encrypt_words(value >> 96, (value >> 64) & 0xffffffff,
+                                                          (value >> 32) & 0xffffffff, value & 0xffffffff,
+                                                          round_words, rounds))
+    return keystream
+
+def ctr_xor(key, counter, data, counter_bits=128):
+    """
+    Encrypts or decrypts data that starts on a block boundary in CTR mode.
+
+    Parameters:
+    - key: the key (or AESKey, or master key tuple when run in a worker process)
+    - counter: the counter block of the first block of the data as a 128-bit integer
+    - data: the bytes-like data
+    - counter_bits: how many of the low bits of the counter block are incremented
+
+    Returns:
+    - The data XORed with the keystream as bytes
+    """
+    return xor_bytes(data, ctr_keystream(key, counter, (len(data) + 15) // 16, counter_bits))
+
+# Size of the pieces that AESCTR.update hands to each worker process.
+ctr_chunk_size = 1 << 20
+
+class AESCTR:
+    """
+    Streaming AES encryption and decryption in counter (CTR) mode. Encryption and decryption are the
+    same operation, data can be passed to update() in pieces of any length and the result is the same
+    as passing it all at once.
+
+    Large updates are split into ranges of the counter space that are encrypted in a
+    ProcessPoolExecutor, since every CTR block can be computed independently.
+
+    Parameters:
+    - key: the key (or AESKey) to be used
+    - counter: the initial counter block, as 16 bytes or as an integer
+    - workers: the number of worker processes for large updates, defaults to the number of CPUs,
+      1 keeps everything in the current process
+    - executor: an existing executor to use instead of starting a process pool
+    - chunk_size: the number of bytes each worker encrypts at a time, a multiple of 16
+    - counter_bits: how many of the low bits of the counter block are incremented (128 by default)
+    """
+    def __init__(self, key, counter, workers=None, executor=None, chunk_size=ctr_chunk_size, counter_bits=128):
+        if chunk_size <= 0 or chunk_size % 16:
+            raise ValueError("Invalid chunk size. The chunk size must be a positive multiple of 16.")
+        if not isinstance(counter, int):
+            if len(counter) != 16:
+                raise ValueError("Invalid counter length. The counter block must be 16 bytes.")
+            counter = int.from_bytes(counter, "big")
+
+        self.key = get_aes_key(key)
+        self.counter = counter
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.chunk_size = chunk_size
+        self.counter_bits = counter_bits
+        self.position = 0 # Number of bytes processed so far
+        self.finalized = False
+
+    def update(self, data):
+        """
+        Encrypts or decrypts the next piece of the stream.
+
+        Parameters:
+        - data: any bytes-like object
+
+        Raises:
+        - ValueError: Raises the exception if the stream was already finalized
+
+        Returns:
+        - The processed data as bytes
+        """
+        if self.finalized:
+            raise ValueError("The CTR stream has already been finalized.")
+
+        data = memoryview(data).cast("B")
+        length = len(data)
+        out = bytearray(length)
+        offset = 0
+
+        # Use up the rest of the keystream block that the previous update stopped in
+        skip = self.position % 16
+        if skip and length:
+            offset = min(16 - skip, length)
+            keystream = ctr_keystream(self.key, self.counter_at(self.position // 16), 1)
+            out[:offset] = xor_bytes(data[:offset], keystream[skip:])
+
+        # Everything left starts on a block boundary
+        first_block = (self.position + offset) // 16
+        if self.workers > 1 and length - offset >= 2 * self.chunk_size:
+            starts = range(offset, length, self.chunk_size)
+            pieces = [bytes(data[start:start + self.chunk_size]) for start in starts]
+            counters = [self.counter_at(first_block + (start - offset) // 16) for start in starts]
+            results = self.get_executor().map(ctr_xor, [self.key.master_key] * len(pieces), counters, pieces,
+                                              [self.counter_bits] * len(pieces))
+            for start, result in zip(starts, results):
+                out[start:start + len(result)] = result
+        elif length > offset:
+            out[offset:] = ctr_xor(self.key, self.counter_at(first_block), data[offset:], self.counter_bits)
+
+        self.position += length
+        return bytes(out)
+
+    def finalize(self):
+        """
+        Ends the stream and shuts down the process pool if this object started it.
+
+        Returns:
+        - The remaining output, which is always empty since CTR mode needs no padding
+        """
+        self.finalized = True
+        if self.executor is not None and self.owns_executor:
+            self.executor.shutdown()
+            self.executor = None
+        return b""
+
+    def counter_at(self, block_index):
+        """
+        Computes the counter block used for a block of the stream.
+
+        Parameters:
+        - block_index: the position of the block in the stream
+
+        Returns:
+        - The counter block as a 128-bit integer
+        """
+        mask = (1 << self.counter_bits) - 1
+        return (self.counter & ~mask) | ((self.counter + block_index) & mask)
+
+    def get_executor(self):
+        """
+        Starts the process pool the first time it is needed.
+
+        Returns:
+        - The executor used for large updates
+        """
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+def aes_ctr(key, counter, data, workers=1):
+    """
+    Encrypts or decrypts a whole message in CTR mode.
+
+    Parameters:
+    - key: the key (or AESKey) to be used
+    - counter: the initial counter block, as 16 bytes or as an integer
+    - data: any bytes-like object
+    - workers: the number of worker processes to use for large messages
+
+    Returns:
+    - The processed message as bytes
+    """
+    stream = AESCTR(key, counter, workers=workers)
+    return stream.update(data) + stream.finalize()
+
+def build_ghash_tables(h):
+    """
+    Builds the multiplication tables for GHASH with the hash subkey H. Multiplying by H is linear,
+    so the product is the XOR of one table entry for each of the 16 bytes of the other factor.
+
+    Parameters:
+    - h: the hash subkey H as a 128-bit integer
+
+    Returns:
+    - A list of 16 tables with the 256 multiples of H for each byte position
+    """
+    # basis[i] is H multiplied by x^i, the element whose bit i is set counting from the most
+    # significant bit, since GCM stores the coefficients in reflected bit order.
+    basis = []
+    value = h
+    for _ in range(128):
+        basis.append(value)
+        if value & 1:
+            value = (value >> 1) ^ (0xe1 << 120) # Reduce by x^128 + x^7 + x^2 + x + 1
+        else:
+            value >>= 1
+
+    tables = []
+    for position in range(16):
+        table = [0] * 256
+        for bit in range(8):
+            step = 1 << bit
+            multiple = basis[8 * position + 7 - bit]
+            for lower in range(step):
+                table[step + lower] = table[lower] ^ multiple
+        tables.append(table)
+    return tables
+
+def get_ghash_tables(aes_key):
+    """
+    Returns the GHASH tables of a key, building them the first time they are needed.
+
+    Parameters:
+    - aes_key: the AESKey
+
+    Returns:
+    - The GHASH tables for the hash subkey E(K, 0^128)
+    """
+    if aes_key.ghash_tables is None:
+        h = ttable_encrypt_words(0, 0, 0, 0, aes_key.encryption_words, aes_key.rounds)
+        aes_key.ghash_tables = build_ghash_tables((h[0] << 96) | (h[1] << 64) | (h[2] << 32) | h[3])
+    return aes_key.ghash_tables
+
+def ghash_blocks(tables, y, data):
+    """
+    Absorbs whole 16-byte blocks into the GHASH value.
+
+    Parameters:
+    - tables: the GHASH tables from build_ghash_tables
+    - y: the current GHASH value
+    - data: a bytes-like object holding a multiple of 16 bytes
+
+    Returns:
+    - The new GHASH value
+    """
+    from_bytes = int.from_bytes
+    for offset in range(0, len(data), 16):
+        x = (y ^ from_bytes(data[offset:offset + 16], "big")).to_bytes(16, "big")
+        y = 0
+        for table, byte in zip(tables, x):
+            y ^= table[byte]
+    return y
+
+class GHASH:
+    """
+    Streaming GHASH that accepts data in pieces of any length. Each call to pad() zero-pads the data
+    absorbed so far up to a whole block, as GCM does at the end of the AAD and of the ciphertext.
+
+    Parameters:
+    - tables: the GHASH tables from build_ghash_tables
+    """
+    def __init__(self, tables):
+        self.tables = tables
+        self.value = 0
+        self.pending = b"" # Bytes of a block that is not complete yet
+
+    def update(self, data):
+        """
+        Absorbs the next piece of data.
+
+        Parameters:
+        - data: any bytes-like object
+        """
+        data = self.pending + bytes(data)
+        whole = len(data) - len(data) % 16
+        self.value = ghash_blocks(self.tables, self.value, memoryview(data)[:whole])
+        self.pending = data[whole:]
+
+    def pad(self):
+        """
+        Zero-pads and absorbs the incomplete block, if there is one.
+        """
+        if self.pending:
+            self.value = ghash_blocks(self.tables, self.value, self.pending.ljust(16, b"\x00"))
+            self.pending = b""
+
+class AESGCM:
+    """
+    Streaming AES-GCM authenticated encryption. The data is encrypted in CTR mode and authenticated
+    with GHASH using multiplication tables cached on the AESKey.
+
+    All the additional authenticated data (AAD) has to be passed to update_aad() before the first
+    call to update(). When encrypting, the tag is in the tag attribute after finalize(). When
+    decrypting, the expected tag is passed to finalize(), which raises ValueError if it does not match.
+
+    Parameters:
+    - key: the key (or AESKey) to be used
+    - iv: the initialization vector, 12 bytes is recommended but any non-empty length works
+    - decrypt: True to decrypt and verify instead of encrypting
+    - tag_length: the length of the tag in bytes, from 4 to 16
+    - workers: the number of worker processes for large updates, as in AESCTR
+    """
+    def __init__(self, key, iv, decrypt=False, tag_length=16, workers=1):
+        if not 4 <= tag_length <= 16:
+            raise ValueError("Invalid tag length. The tag must be between 4 and 16 bytes.")
+        if not iv:
+            raise ValueError("Invalid IV length. The IV must not be empty.")
+
+        self.key = get_aes_key(key)
+        self.decrypt = decrypt
+        self.tag_length = tag_length
+        self.tag = None
+        tables = get_ghash_tables(self.key)
+
+        # Pre-counter block J0
+        if len(iv) == 12:
+            self.j0 = int.from_bytes(bytes(iv) + b"\x00\x00\x00\x01", "big")
+        else:
+            iv_hash = GHASH(tables)
+            iv_hash.update(iv)
+            iv_hash.pad()
+            iv_hash.update((len(iv) * 8).to_bytes(16, "big"))
+            self.j0 = iv_hash.value
+
+        # The data is encrypted starting from inc32(J0)
+        j0_prefix = self.j0 & ~0xffffffff
+        self.ctr = AESCTR(self.key, j0_prefix | ((self.j0 + 1) & 0xffffffff), workers=workers, counter_bits=32)
+        self.ghash = GHASH(tables)
+        self.aad_length = 0
+        self.data_length = 0
+        self.data_started = False # Set by the first update(), even an empty one, as the AAD is padded there
+        self.finalized = False
+
+    def update_aad(self, data):
+        """
+        Adds the next piece of the additional authenticated data.
+
+        Parameters:
+        - data: any bytes-like object
+
+        Raises:
+        - ValueError: Raises the exception if update() or finalize() were already called
+        """
+        if self.finalized or self.data_started:
+            raise ValueError("The AAD must be passed before the data.")
+        self.aad_length += len(data)
+        self.ghash.update(data)
+
+    def update(self, data):
+        """
+        Encrypts or decrypts the next piece of the data.
+
+        Parameters:
+        - data: any bytes-like object
+
+        Raises:
+        - ValueError: Raises the exception if the stream was already finalized
+
+        Returns:
+        - The processed data as bytes
+        """
+        if self.finalized:
+            raise ValueError("The GCM stream has already been finalized.")
+        if not self.data_started:
+            self.data_started = True
+            self.ghash.pad() # The AAD ends here
+        output = self.ctr.update(data)
+        self.data_length += len(output)
+        self.ghash.update(data if self.decrypt else output)
+        return output
+
+    def finalize(self, tag=None):
+        """
+        Ends the stream and computes the authentication tag.
+
+        Parameters:
+        - tag: the expected tag, required when decrypting
+
+        Raises:
+        - ValueError: Raises the exception if the tag is missing or does not match when decrypting
+
+        Returns:
+        - The remaining output, which is always empty since GCM needs no padding
+        """
+        if not self.finalized:
+            self.finalized = True
+            self.ctr.finalize()
+            self.ghash.pad()
+            self.ghash.update(((self.aad_length * 8) << 64 | (self.data_length * 8)).to_bytes(16, "big"))
+            mask = ctr_keystream(self.key, self.j0, 1)
+            self.tag = xor_bytes(self.ghash.value.to_bytes(16, "big"), mask)[:self.tag_length]
+
+        if self.decrypt:
+            if tag is None:
+                raise ValueError("The expected tag is required to finalize decryption.")
+            if not hmac.compare_digest(self.tag, bytes(tag)):
+                raise ValueError("The authentication tag does not match.")
+        return b""
+
+def aes_gcm_encrypt(key, iv, plaintext, aad=b""):
+    """
+    Encrypts and authenticates a whole message with AES-GCM.
+
+    Parameters:
+    - key: the key (or AESKey) to be used
+    - iv: the initialization vector
+    - plaintext: the message to be encrypted
+    - aad: additional data that is authenticated but not encrypted
+
+    Returns:
+    - The ciphertext and the 16-byte tag
+    """
+    stream = AESGCM(key, iv)
+    stream.update_aad(aad)
+    ciphertext = stream.update(plaintext) + stream.finalize()
+    return ciphertext, stream.tag
+
+def aes_gcm_decrypt(key, iv, ciphertext, tag, aad=b""):
+    """
+    Verifies and decrypts a whole message with AES-GCM.
+
+    Parameters:
+    - key: the key (or AESKey) to be used
+    - iv: the initialization vector
+    - ciphertext: the message to be decrypted
+    - tag: the tag produced when encrypting
+    - aad: the additional authenticated data
+
+    Raises:
+    - ValueError: Raises the exception if the tag does not match
+
+    Returns:
+    - The decrypted message
+    """
+    stream = AESGCM(key, iv, decrypt=True, tag_length=len(tag))
+    stream.update_aad(aad)
+    plaintext = stream.update(ciphertext)
+    stream.finalize(tag)
+    return plaintext
+
+def benchmark_modes(size=1 << 20):
+    """
+    Measures the throughput of CTR and GCM on the same data.
+
+    Parameters:
+    - size: the number of bytes to encrypt with each mode
+
+    Returns:
+    - A dictionary with the throughput of each mode in MB/s
+    """
+    key = list(os.urandom(16))
+    data = os.urandom(size)
+    get_ghash_tables(get_aes_key(key)) # Build the tables before timing
+
+    results = {}
+    start = time.perf_counter()
+    aes_ctr(key, os.urandom(16), data)
+    results["ctr"] = size / (time.perf_counter() - start) / 1e6
+
+    start = time.perf_counter()
+    aes_gcm_encrypt(key, os.urandom(12), data)
+    results["gcm"] = size / (time.perf_counter() - start) / 1e6
+    return results
+
+def split_xts_key(key):
+    """
+    Splits an XTS key into the data key and the tweak key.
+
+    Parameters:
+    - key: the 256-bit XTS key, the data key followed by the tweak key
+
+    Raises:
+    - ValueError: Raises the exception if the value is not the correct length
+
+    Returns:
+    - The AESKey for the data and the AESKey for the tweaks
+    """
+    if len(key) != 32:
+        raise ValueError("Invalid XTS key length. Key must be 256-bit (two 128-bit keys).")
+    key = tuple(key)
+    return get_aes_key(key[:16]), get_aes_key(key[16:])
+
+def xts_tweaks(tweak_key, sector_index, block_count):
+    """
+    Generates the tweak of every block of a sector. The first tweak is the encrypted sector index,
+    each next one is the previous tweak multiplied by x in GF(2^128).
+
+    Parameters:
+    - tweak_key: the AESKey for the tweaks
+    - sector_index: the index of the sector
+    - block_count: the number of tweaks to generate
+
+    Returns:
+    - A bytearray with 16 x block_count bytes of tweaks
+    """
+    words = ttable_encrypt_words(*block_struct.unpack(sector_index.to_bytes(16, "little")),
+                                 tweak_key.encryption_words, tweak_key.rounds)
+    tweak = int.from_bytes(block_struct.pack(*words), "little")
+
+    tweaks = bytearray(16 * block_count)
+    for i in range(block_count):
+        tweaks[16 * i:16 * i + 16] = tweak.to_bytes(16, "little")
+        tweak <<= 1
+        if tweak >> 128:
+            tweak ^= 0x100000000000000000000000000000087 # Reduce by x^128 + x^7 + x^2 + x + 1
+    return tweaks
+
+def xts_sector(data_key, tweak_key, data, sector_index, decrypt=False):
+    """
+    Encrypts or decrypts one sector with XTS, using ciphertext stealing when the sector
+    is not a whole number of blocks.
+
+    Parameters:
+    - data_key: the AESKey for the data
+    - tweak_key: the AESKey for the tweaks
+    - data: the bytes-like contents of the sector, at least 16 bytes
+    - sector_index: the index of the sector
+    - decrypt: True to decrypt instead of encrypting
+
+    Raises:
+    - ValueError: Raises the exception if the sector is shorter than one block
+
+    Returns:
+    - The processed sector as bytes
+    """
+    length = len(data)
+    if length < 16:
+        raise ValueError("Invalid sector length. A sector must be at least 16 bytes.")
+    full_blocks, partial = divmod(length, 16)
+    tweaks = xts_tweaks(tweak_key, sector_index, full_blocks + (1 if partial else 0))
+    process_blocks = decrypt_blocks if decrypt else encrypt_blocks
+
+    def xex(blocks, block_tweaks):
+        return xor_bytes(process_blocks(data_key, xor_bytes(blocks, block_tweaks)), block_tweaks)
+
+    if not partial:
+        return xex(data, tweaks)
+
+    # Every block but the last full one is processed normally
+    head = 16 * (full_blocks - 1)
+    out = bytearray(length)
+    out[:head] = xex(data[:head], tweaks[:head])
+
+    # The last full block and the partial block swap tweaks when decrypting, and the
+    # partial block borrows the missing bytes from the last full block
+    last_tweak = tweaks[head:head + 16]
+    partial_tweak = tweaks[head + 16:]
+    if decrypt:
+        last_tweak, partial_tweak = partial_tweak, last_tweak
+    borrowed = xex(data[head:head + 16], last_tweak)
+    out[head:head + 16] = xex(bytes(data[head + 16:]) + borrowed[partial:], partial_tweak)
+    out[head + 16:] = borrowed[:partial]
+    return bytes(out)
+
+def xts_process(key, data, sector_size=512, first_sector=0, decrypt=False, out=None):
+    """
+    Encrypts or decrypts consecutive sectors of a buffer with XTS.
+
+    Parameters:
+    - key: the 256-bit XTS key, the data key followed by the tweak key
+    - data: any bytes-like object, the last sector may be shorter than sector_size but needs at least 16 bytes
+    - sector_size: the size of each sector in bytes, at least 16
+    - first_sector: the index of the first sector in the buffer
+    - decrypt: True to decrypt instead of encrypting
+    - out: optional writable bytes-like object of the same length to write the result into
+
+    Raises:
+    - ValueError: Raises the exception if the key, the sector size or the buffers have the wrong length,
+      or the last sector is shorter than 16 bytes
+
+    Returns:
+    - The buffer holding the result, which is out when it is given
+    """
+    if sector_size < 16:
+        raise ValueError("Invalid sector size. A sector must be at least 16 bytes.")
+    data_key, tweak_key = split_xts_key(key)
+    source = memoryview(data).cast("B")
+    length = len(source)
+    if 0 < length % sector_size < 16:
+        raise ValueError("Invalid data length. The last sector must be at least 16 bytes.")
+
+    if out is None:
+        out = bytearray(length)
+    destination = memoryview(out).cast("B")
+    if len(destination) != length:
+        raise ValueError("Invalid output length. The output must be the same length as the input.")
+
+    for sector, offset in enumerate(range(0, length, sector_size), first_sector):
+        end = min(offset + sector_size, length)
+        destination[offset:end] = xts_sector(data_key, tweak_key, source[offset:end], sector, decrypt)
+    return out
+
+def xts_encrypt(key, data, sector_size=512, first_sector=0, out=None):
+    """
+    Encrypts consecutive sectors of a buffer with XTS.
+
+    Parameters:
+    - key: the 256-bit XTS key, the data key followed by the tweak key
+    - data: any bytes-like object, the last sector may be shorter than sector_size but needs at least 16 bytes
+    - sector_size: the size of each sector in bytes, at least 16
+    - first_sector: the index of the first sector in the buffer
+    - out: optional writable bytes-like object of the same length to write the ciphertext into
+
+    Returns:
+    - The buffer holding the ciphertext, which is out when it is given
+    """
+    return xts_process(key, data, sector_size, first_sector, False, out)
+
+def xts_decrypt(key, data, sector_size=512, first_sector=0, out=None):
+    """
+    Decrypts consecutive sectors of a buffer with XTS.
+
+    Parameters:
+    - key: the 256-bit XTS key, the data key followed by the tweak key
+    - data: any bytes-like object, the last sector may be shorter than sector_size but needs at least 16 bytes
+    - sector_size: the size of each sector in bytes, at least 16
+    - first_sector: the index of the first sector in the buffer
+    - out: optional writable bytes-like object of the same length to write the plaintext into
+
+    Returns:
+    - The buffer holding the plaintext, which is out when it is given
+    """
+    return xts_process(key, data, sector_size, first_sector, True, out)
+
+def xts_file_worker(key, source, destination, offset, length, sector_size, first_sector, decrypt):
+    """
+    Processes a range of sectors of a file, mapping both files into memory instead of reading them.
+
+    Parameters:
+    - key: the 256-bit XTS key
+    - source: the path of the input file
+    - destination: the path of the output file, already the same size as the input
+    - offset: the byte offset of the first sector of the range
+    - length: the number of bytes in the range
+    - sector_size: the size of each sector in bytes
+    - first_sector: the index of the first sector of the range
+    - decrypt: True to decrypt instead of encrypting
+
+    Returns:
+    - The number of bytes processed
+    """
+    with open(source, "rb") as source_file, open(destination, "r+b") as destination_file:
+        with mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ) as source_map, \
+             mmap.mmap(destination_file.fileno(), 0, access=mmap.ACCESS_WRITE) as destination_map:
+            xts_process(key, memoryview(source_map)[offset:offset + length], sector_size, first_sector,
+                        decrypt, memoryview(destination_map)[offset:offset + length])
+            destination_map.flush()
+    return length
+
+# Number of sectors that each task of xts_process_file works on.
+xts_sectors_per_task = 2048
+
+def xts_process_file(key, source, destination, sector_size=512, first_sector=0, sectors=None,
+                     decrypt=False, workers=None):
+    """
+    Encrypts or decrypts a disk image with XTS. Ranges of sectors are processed concurrently in a
+    process pool and both files are memory-mapped, so the image never has to fit in memory.
+
+    Parameters:
+    - key: the 256-bit XTS key, the data key followed by the tweak key
+    - source: the path of the input image
+    - destination: the path of the output image, it is created or resized to the size of the input
+    - sector_size: the size of each sector in bytes, at least 16
+    - first_sector: the sector index of the start of the image
+    - sectors: an optional range of sector numbers (counted from the start of the image) to process,
+      by default every sector is processed
+    - decrypt: True to decrypt instead of encrypting
+    - workers: the number of worker processes, defaults to the number of CPUs, 1 runs in this process
+
+    Raises:
+    - ValueError: Raises the exception if the key or the sector size are not valid, or the last
+      sector of the image is shorter than 16 bytes
+
+    Returns:
+    - The number of bytes processed
+    """
+    split_xts_key(key) # Check the key before starting any work
+    if sector_size < 16:
+        raise ValueError("Invalid sector size. A sector must be at least 16 bytes.")
+
+    size = os.path.getsize(source)
+    if 0 < size % sector_size < 16:
+        raise ValueError("Invalid image size. The last sector must be at least 16 bytes.")
+    sector_count = (size + sector_size - 1) // sector_size
+    if sectors is None:
+        sectors = range(sector_count)
+    sectors = range(max(sectors.start, 0), min(sectors.stop, sector_count))
+
+    # Give the output its final size so every worker can map it
+    mode = "r+b" if os.path.exists(destination) else "wb"
+    with open(destination, mode) as destination_file:
+        destination_file.truncate(size)
+
+    tasks = []
+    for start in range(sectors.start, sectors.stop, xts_sectors_per_task):
+        stop = min(start + xts_sectors_per_task, sectors.stop)
+        offset = start * sector_size
+        length = min(stop * sector_size, size) - offset
+        tasks.append((tuple(key), source, destination, offset, length, sector_size, first_sector + start, decrypt))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        return sum(xts_file_worker(*task) for task in tasks)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(xts_file_worker, *zip(*tasks)))
+
+# The available engines as (encryption, decryption) pairs, so they can be compared on the same inputs.
+aes_engines = {
+    "reference": (aes_encryption, aes_decryption),
+    "ttable": (ttable_aes_encryption, ttable_aes_decryption),
+}
+
 def main():
     # Initialize the plaintext and key
     plaintext = [0xff] * 16 # 128-bit block of all 1's in hex
@@ -382,5 +1700,16 @@ def main():
     for i in range(4):
         print(' '.join(format(decrypted_ciphertext[i * 4 + j], '08b') for j in range(4)))    
 
+    # Compare every engine against the reference path on the same inputs
+    for name, (encrypt, decrypt) in aes_engines.items():
+        matches = encrypt(plaintext, master_key) == ciphertext and decrypt(ciphertext, master_key) == decrypted_ciphertext
+        print(f"Engine '{name}' matches the reference path: {matches}")
+
+    # The equivalent inverse cipher gives back the original plaintext
+    print(f"Equivalent inverse cipher recovers the plaintext: {equivalent_inverse_decryption(ciphertext, master_key) == plaintext}")
+
+    # The master key was only expanded once for all the calls above
+    print(f"Expanded key cache hit rate: {aes_key_cache_stats()['hit_rate']:.0%}")
+
 if __name__=="__main__":
     main()
\ No newline at end of file
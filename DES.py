@@ -1,3 +1,103 @@
+from array import array
+import functools
+import operator
+import os
+import struct
+import time
+
+# DES lookup tables, shared by the bit-list functions and the integer engine below
+initial_permute_table = [58, 50, 42, 34, 26, 18, 10, 2,
+                         60, 52, 44, 36, 28, 20, 12, 4,
+                         62, 54, 46, 38, 30, 22, 14, 6,
+                         64, 56, 48, 40, 32, 24, 16, 8,
+                         57, 49, 41, 33, 25, 17, 9, 1,
+                         59, 51, 43, 35, 27, 19, 11, 3,
+                         61, 53, 45, 37, 29, 21, 13, 5,
+                         63, 55, 47, 39, 31, 23, 15, 7]
+
+final_permute_table = [40, 8, 48, 16, 56, 24, 64, 32,
+                       39, 7, 47, 15, 55, 23, 63, 31,
+                       38, 6, 46, 14, 54, 22, 62, 30,
+                       37, 5, 45, 13, 53, 21, 61, 29,
+                       36, 4, 44, 12, 52, 20, 60, 28,
+                       35, 3, 43, 11, 51, 19, 59, 27,
+                       34, 2, 42, 10, 50, 18, 58, 26,
+                       33, 1, 41, 9, 49, 17, 57, 25]
+
+pc1_table = [57, 49, 41, 33, 25, 17, 9, 1,
+             58, 50, 42, 34, 26, 18, 10, 2,
+             59, 51, 43, 35, 27, 19, 11, 3,
+             60, 52, 44, 36, 63, 55, 47, 39,
+             31, 23, 15, 7, 62, 54, 46, 38,
+             30, 22, 14, 6, 61, 53, 45, 37,
+             29, 21, 13, 5, 28, 20, 12, 4]
+
+pc2_table = [14, 17, 11, 24, 1, 5, 3, 28,
+             15, 6, 21, 10, 23, 19, 12, 4,
+             26, 8, 16, 7, 27, 20, 13, 2,
+             41, 52, 31, 37, 47, 55, 30, 40,
+             51, 45, 33, 48, 44, 49, 39, 56,
+             34, 53, 46, 42, 50, 36, 29, 32]
+
+key_shifts = [1, 1, 2, 2, 2, 2, 2, 2, 
+              1, 2, 2, 2, 2, 2, 2, 1]
+
+expansion_table = [32, 1, 2, 3, 4, 5, 
+                   4, 5, 6, 7, 8, 9, 
+                   8, 9, 10, 11, 12, 13, 
+                   12, 13, 14, 15, 16, 17, 
+                   16, 17, 18, 19, 20, 21, 
+                   20, 21, 22, 23, 24, 25, 
+                   24, 25, 26, 27, 28, 29, 
+                   28, 29, 30, 31, 32, 1]
+
+s_boxes = [
+    [ # S-box S_1
+        [14, 4, 13, 1, 2, 15, 11, 8, 3, 10, 6, 12, 5, 9, 0, 7],
+        [0, 15, 7, 4, 14, 2, 13, 1, 10, 6, 12, 11, 9, 5, 3, 8],
+        [4, 1, 14, 8, 13, 6, 2, 11, 15, 12, 9, 7, 3, 10, 5, 0],
+        [15, 12, 8, 2, 4, 9, 1, 7, 5, 11, 3, 14, 10, 0, 6, 13]],
+    [ # S-box S_2
+        [15, 1, 8, 14, 6, 11, 3, 4, 9, 7, 2, 13, 12, 0, 5, 10],
+        [3, 13, 4, 7, 15, 2, 8, 14, 12, 0, 1, 10, 6, 9, 11, 5],
+        [0, 14, 7, 11, 10, 4, 13, 1, 5, 8, 12, 6, 9, 3, 2, 15],
+        [13, 8, 10, 1, 3, 15, 4, 2, 11, 6, 7, 12, 0, 5, 14, 9]],
+    [ # S-box S_3
+        [10, 0, 9, 14, 6, 3, 15, 5, 1, 13, 12, 7, 11, 4, 2, 8],
+        [13, 7, 0, 9, 3, 4, 6, 10, 2, 8, 5, 14, 12, 11, 15, 1],
+        [13, 6, 4, 9, 8, 15, 3, 0, 11, 1, 2, 12, 5, 10, 14, 7],
+        [1, 10, 13, 0, 6, 9, 8, 7, 4, 15, 14, 3, 11, 5, 2, 12]],
+    [# S-box S_4
+        [7, 13, 14, 3, 0, 6, 9, 10, 1, 2, 8, 5, 11, 12, 4, 15],
+        [13, 8, 11, 5, 6, 15, 0, 3, 4, 7, 2, 12, 1, 10, 14, 9],
+        [10, 6, 9, 0, 12, 11, 7, 13, 15, 1, 3, 14, 5, 2, 8, 4],
+        [3, 15, 0, 6, 10, 1, 13, 8, 9, 4, 5, 11, 12, 7, 2, 14]],
+    [ # S-box S_5
+        [2, 12, 4, 1, 7, 10, 11, 6, 8, 5, 3, 15, 13, 0, 14, 9],
+        [14, 11, 2, 12, 4, 7, 13, 1, 5, 0, 15, 10, 3, 9, 8, 6],
+        [4, 2, 1, 11, 10, 13, 7, 8, 15, 9, 12, 5, 6, 3, 0, 14],
+        [11, 8, 12, 7, 1, 14, 2, 13, 6, 15, 0, 9, 10, 4, 5, 3]],
+    [ # S-box S_6
+        [12, 1, 10, 15, 9, 2, 6, 8, 0, 13, 3, 4, 14, 7, 5, 11],
+        [10, 15, 4, 2, 7, 12, 9, 5, 6, 1, 13, 14, 0, 11, 3, 8],
+        [9, 14, 15, 5, 2, 8, 12, 3, 7, 0, 4, 10, 1, 13, 11, 6],
+        [4, 3, 2, 12, 9, 5, 15, 10, 11, 14, 1, 7, 6, 0, 8, 13]],
+    [ # S-box S_7
+        [4, 11, 2, 14, 15, 0, 8, 13, 3, 12, 9, 7, 5, 10, 6, 1],
+        [13, 0, 11, 7, 4, 9, 1, 10, 14, 3, 5, 12, 2, 15, 8, 6],
+        [1, 4, 11, 13, 12, 3, 7, 14, 10, 15, 6, 8, 0, 5, 9, 2],
+        [6, 11, 13, 8, 1, 4, 10, 7, 9, 5, 0, 15, 14, 2, 3, 12]],
+    [ # S-box S_8
+        [13, 2, 8, 4, 6, 15, 11, 1, 10, 9, 3, 14, 5, 0, 12, 7],
+        [1, 15, 13, 8, 10, 3, 7, 4, 12, 5, 6, 11, 0, 14, 9, 2],
+        [7, 11, 4, 1, 9, 12, 14, 2, 0, 6, 10, 13, 15, 3, 5, 8],
+        [2, 1, 14, 7, 4, 10, 8, 13, 15, 12, 9, 0, 3, 5, 6, 11]]]
+
+permutation_table = [16, 7, 20, 21, 29, 12, 28, 17,
+                     1, 15, 23, 26, 5, 18, 31, 10,
+                     2, 8, 24, 14, 32, 27, 3, 9,
+                     19, 13, 30, 6, 22, 11, 4, 25]
+
 def initial_permutation(block):
     """
     Layer that performs the initial permutation on the block of plaintext.
@@ -8,15 +108,6 @@ def initial_permutation(block):
     Returns:
     - The block of plaintext after permutation
     """
-    initial_permute_table = [58, 50, 42, 34, 26, 18, 10, 2,
-                             60, 52, 44, 36, 28, 20, 12, 4,
-                             62, 54, 46, 38, 30, 22, 14, 6,
-                             64, 56, 48, 40, 32, 24, 16, 8,
-                             57, 49, 41, 33, 25, 17, 9, 1,
-                             59, 51, 43, 35, 27, 19, 11, 3,
-                             61, 53, 45, 37, 29, 21, 13, 5,
-                             63, 55, 47, 39, 31, 23, 15, 7]
-    
     if isinstance(block, int):
         # If the block is an integer, convert it to a list of bits
         block = [int(bit) for bit in bin(block)[2:].zfill(64)] 
@@ -35,15 +126,6 @@ def final_permutation(block):
     Returns:
     - The block of ciphertext after permutation
     """
-    final_permute_table = [40, 8, 48, 16, 56, 24, 64, 32,
-                           39, 7, 47, 15, 55, 23, 63, 31,
-                           38, 6, 46, 14, 54, 22, 62, 30,
-                           37, 5, 45, 13, 53, 21, 61, 29,
-                           36, 4, 44, 12, 52, 20, 60, 28,
-                           35, 3, 43, 11, 51, 19, 59, 27,
-                           34, 2, 42, 10, 50, 18, 58, 26,
-                           33, 1, 41, 9, 49, 17, 57, 25]
-    
     permuted_ct_block = [block[i - 1] for i in final_permute_table]
     return permuted_ct_block
 
@@ -57,24 +139,6 @@ def key_schedule(key):
     Returns:
     - The list containing the keys for the 16 rounds
     """
-    pc1_table = [57, 49, 41, 33, 25, 17, 9, 1,
-                 58, 50, 42, 34, 26, 18, 10, 2,
-                 59, 51, 43, 35, 27, 19, 11, 3,
-                 60, 52, 44, 36, 63, 55, 47, 39,
-                 31, 23, 15, 7, 62, 54, 46, 38,
-                 30, 22, 14, 6, 61, 53, 45, 37,
-                 29, 21, 13, 5, 28, 20, 12, 4]
-    
-    pc2_table = [14, 17, 11, 24, 1, 5, 3, 28,
-                 15, 6, 21, 10, 23, 19, 12, 4,
-                 26, 8, 16, 7, 27, 20, 13, 2,
-                 41, 52, 31, 37, 47, 55, 30, 40,
-                 51, 45, 33, 48, 44, 49, 39, 56,
-                 34, 53, 46, 42, 50, 36, 29, 32]
-    
-    key_shifts = [1, 1, 2, 2, 2, 2, 2, 2, 
-                  1, 2, 2, 2, 2, 2, 2, 1]
-    
     # Initialize an empty list for the round keys
     round_keys = []
 
@@ -111,16 +175,7 @@ def reversed_key_schedule(key):
     - The list containing the reversed key order for decrypting in the 16 rounds
     """
     reversed_keys = key_schedule(key)
-    reversed_keys.reverse() # Reverses the list of round keys
-
-    # Adjust the rotations for decryption
-    for i in range(1, 16, 3):
-        left_half = reversed_keys[i][:28]
-        right_half = reversed_keys[i][28:]
-        shifted_left_half = left_half[2:] + left_half[:2]
-        shifted_right_half = right_half[2:] + right_half[:2]
-        reversed_keys[i] = shifted_left_half + shifted_right_half
-        
+    reversed_keys.reverse() # Decryption uses the same round keys in reverse order
     return reversed_keys
 
 def expansion_e(block):
@@ -133,15 +188,6 @@ def expansion_e(block):
     Returns:
     - The expanded right half of the initial permutation
     """
-    expansion_table = [32, 1, 2, 3, 4, 5, 
-                       4, 5, 6, 7, 8, 9, 
-                       8, 9, 10, 11, 12, 13, 
-                       12, 13, 14, 15, 16, 17, 
-                       16, 17, 18, 19, 20, 21, 
-                       20, 21, 22, 23, 24, 25, 
-                       24, 25, 26, 27, 28, 29, 
-                       28, 29, 30, 31, 32, 1]
-    
     expanded_block = [block[i - 1] for i in expansion_table]
     return expanded_block
 
@@ -187,48 +233,6 @@ def s_box_substitution(block):
     Returns:
     - The ciphertext after being put through the nonlinear S-boxes 
     """
-    s_boxes = [
-        [ # S-box S_1
-            [14, 4, 13, 1, 2, 15, 11, 8, 3, 10, 6, 12, 5, 9, 0, 7],
-            [0, 15, 7, 4, 14, 2, 13, 1, 10, 6, 12, 11, 9, 5, 3, 8],
-            [4, 1, 14, 8, 13, 6, 2, 11, 15, 12, 9, 7, 3, 10, 5, 0],
-            [15, 12, 8, 2, 4, 9, 1, 7, 5, 11, 3, 14, 10, 0, 6, 13]],
-        [ # S-box S_2
-            [15, 1, 8, 14, 6, 11, 3, 4, 9, 7, 2, 13, 12, 0, 5, 10],
-            [3, 13, 4, 7, 15, 2, 8, 14, 12, 0, 1, 10, 6, 9, 11, 5],
-            [0, 14, 7, 11, 10, 4, 13, 1, 5, 8, 12, 6, 9, 3, 2, 15],
-            [13, 8, 10, 1, 3, 15, 4, 2, 11, 6, 7, 12, 0, 5, 14, 9]],
-        [ # S-box S_3
-            [10, 0, 9, 14, 6, 3, 15, 5, 1, 13, 12, 7, 11, 4, 2, 8],
-            [13, 7, 0, 9, 3, 4, 6, 10, 2, 8, 5, 14, 12, 11, 15, 1],
-            [13, 6, 4, 9, 8, 15, 3, 0, 11, 1, 2, 12, 5, 10, 14, 7],
-            [1, 10, 13, 0, 6, 9, 8, 7, 4, 15, 14, 3, 11, 5, 2, 12]],
-        [# S-box S_4
-            [7, 13, 14, 3, 0, 6, 9, 10, 1, 2, 8, 5, 11, 12, 4, 15],
-            [13, 8, 11, 5, 6, 15, 0, 3, 4, 7, 2, 12, 1, 10, 14, 9],
-            [10, 6, 9, 0, 12, 11, 7, 13, 15, 1, 3, 14, 5, 2, 8, 4],
-            [3, 15, 0, 6, 10, 1, 13, 8, 9, 4, 5, 11, 12, 7, 2, 14]],
-        [ # S-box S_5
-            [2, 12, 4, 1, 7, 10, 11, 6, 8, 5, 3, 15, 13, 0, 14, 9],
-            [14, 11, 2, 12, 4, 7, 13, 1, 5, 0, 15, 10, 3, 9, 8, 6],
-            [4, 2, 1, 11, 10, 13, 7, 8, 15, 9, 12, 5, 6, 3, 0, 14],
-            [11, 8, 12, 7, 1, 14, 2, 13, 6, 15, 0, 9, 10, 4, 5, 3]],
-        [ # S-box S_6
-            [12, 1, 10, 15, 9, 2, 6, 8, 0, 13, 3, 4, 14, 7, 5, 11],
-            [10, 15, 4, 2, 7, 12, 9, 5, 6, 1, 13, 14, 0, 11, 3, 8],
-            [9, 14, 15, 5, 2, 8, 12, 3, 7, 0, 4, 10, 1, 13, 11, 6],
-            [4, 3, 2, 12, 9, 5, 15, 10, 11, 14, 1, 7, 6, 0, 8, 13]],
-        [ # S-box S_7
-            [4, 11, 2, 14, 15, 0, 8, 13, 3, 12, 9, 7, 5, 10, 6, 1],
-            [13, 0, 11, 7, 4, 9, 1, 10, 14, 3, 5, 12, 2, 15, 8, 6],
-            [1, 4, 11, 13, 12, 3, 7, 14, 10, 15, 6, 8, 0, 5, 9, 2],
-            [6, 11, 13, 8, 1, 4, 10, 7, 9, 5, 0, 15, 14, 2, 3, 12]],
-        [ # S-box S_8
-            [13, 2, 8, 4, 6, 15, 11, 1, 10, 9, 3, 14, 5, 0, 12, 7],
-            [1, 15, 13, 8, 10, 3, 7, 4, 12, 5, 6, 11, 0, 14, 9, 2],
-            [7, 11, 4, 1, 9, 12, 14, 2, 0, 6, 10, 13, 15, 3, 5, 8],
-            [2, 1, 14, 7, 4, 10, 8, 13, 15, 12, 9, 0, 3, 5, 6, 11]]]
-
     substituted_block =[]
     for i in range(8):
         s_box = s_boxes[i]
@@ -248,11 +252,6 @@ def permutation_p(block):
     Returns:
     - The ciphertext after being put through the permutation P function
     """
-    permutation_table = [16, 7, 20, 21, 29, 12, 28, 17,
-                         1, 15, 23, 26, 5, 18, 31, 10,
-                         2, 8, 24, 14, 32, 27, 3, 9,
-                         19, 13, 30, 6, 22, 11, 4, 25]
-    
     permuted_block = [block[i - 1] for i in permutation_table]
     return permuted_block
     
@@ -264,7 +263,7 @@ def des_feistel_network(block, round_key):
     xor_result = xor(expanded_right, round_key)
     substituted = s_box_substitution(xor_result)
     permuted = permutation_p(substituted)
-    new_right_half = xor(left_half, permuted)
+    new_right_half = [l ^ p for l, p in zip(left_half, permuted)] # Both halves are 32 bits
     return right_half + new_right_half
 
 def des_block_processing(blocks, keys):
@@ -299,7 +298,7 @@ def des_encrypt(plaintext, key):
     Returns:
     -  The ciphertext after going through the DES algorithm
     """
-    keys = key_schedule(key)
+    keys = [int_to_bits(round_key, 48) for round_key in get_des_key(key).encryption_round_keys]
     plaintext_blocks = [plaintext[i:i + 64] for i in range(0, len(plaintext), 64)]
     ciphertext = []
     encrypted_blocks = des_block_processing(plaintext_blocks, keys)
@@ -318,7 +317,7 @@ def des_decrypt(ciphertext, key):
     Returns:
     - The decrypted text after going through the DES algorithm
     """
-    keys = reversed_key_schedule(key)
+    keys = [int_to_bits(round_key, 48) for round_key in get_des_key(key).decryption_round_keys]
     ciphertext_blocks = [ciphertext[i:i + 64] for i in range(0, len(ciphertext), 64)]
     plaintext = []
     decrypted_blocks = des_block_processing(ciphertext_blocks, keys)
@@ -326,6 +325,869 @@ def des_decrypt(ciphertext, key):
         plaintext.extend(block)
     return plaintext
 
+def build_permutation_tables(table, input_width):
+    """
+    Builds byte-indexed lookup tables for a DES permutation on integers, so the permutation
+    takes one lookup per input byte instead of one step per bit.
+
+    Parameters:
+    - table: the permutation table, with 1-based bit positions counted from the most significant bit
+    - input_width: the number of bits of the input, a multiple of 8
+
+    Returns:
+    - A list with one 256-entry table per input byte, the most significant byte first
+    """
+    output_width = len(table)
+    byte_tables = []
+    for byte_index in range(input_width // 8):
+        byte_table = []
+        for value in range(256):
+            output = 0
+            for output_position, input_position in enumerate(table):
+                bit = input_position - 1 - 8 * byte_index # Position of the bit inside this byte
+                if 0 <= bit < 8 and (value >> (7 - bit)) & 1:
+                    output |= 1 << (output_width - 1 - output_position)
+            byte_table.append(output)
+        byte_tables.append(byte_table)
+    return byte_tables
+
+def permute_int(value, byte_tables):
+    """
+    Applies a permutation built with build_permutation_tables to an integer.
+
+    Parameters:
+    - value: the input as an integer
+    - byte_tables: the lookup tables of the permutation
+
+    Returns:
+    - The permuted integer
+    """
+    result = 0
+    shift = 8 * (len(byte_tables) - 1)
+    for byte_table in byte_tables:
+        result |= byte_table[(value >> shift) & 0xff]
+        shift -= 8
+    return result
+
+def build_sp_tables():
+    """
+    Merges every S-box with the permutation P, so one lookup gives the permuted 32-bit output of an S-box.
+
+    Returns:
+    - A list with eight 64-entry tables indexed by the 6-bit input of each S-box
+    """
+    sp_tables = []
+    for i in range(8):
+        sp_table = []
+        for value in range(64):
+            row = ((value >> 4) & 2) | (value & 1)
+            column = (value >> 1) & 0xf
+            output = s_boxes[i][row][column] << (28 - 4 * i) # S-box output in its place before P
+            permuted = 0
+            for output_position, input_position in enumerate(permutation_table):
+                if (output >> (32 - input_position)) & 1:
+                    permuted |= 1 << (31 - output_position)
+            sp_table.append(permuted)
+        sp_tables.append(sp_table)
+    return sp_tables
+
+def build_round_tables(sp_tables):
+    """
+    Builds the tables used in each round of the integer engine. The expansion E is linear, so both
+    halves are kept expanded to 48 bits for the whole run: each table maps the 12-bit input of two
+    neighbouring S-boxes to the expansion of their SP output, and a round is then one XOR with the
+    round key and four lookups.
+
+    Parameters:
+    - sp_tables: the eight SP tables from build_sp_tables
+
+    Returns:
+    - A list with four 4096-entry tables
+    """
+    expansion_tables = build_permutation_tables(expansion_table, 32)
+    expanded = [[permute_int(value, expansion_tables) for value in sp_table] for sp_table in sp_tables]
+    return [[expanded[2 * i][high] | expanded[2 * i + 1][low] for high in range(64) for low in range(64)]
+            for i in range(4)]
+
+# Lookup tables of the integer engine. The initial permutation goes straight to both expanded halves,
+# and the final permutation reads each bit from its first copy in the expanded halves.
+ip_tables = build_permutation_tables([initial_permute_table[i - 1] for i in expansion_table] +
+                                     [initial_permute_table[i + 31] for i in expansion_table], 64)
+fp_tables = build_permutation_tables([expansion_table.index(i) + 1 if i <= 32 else expansion_table.index(i - 32) + 49
+                                      for i in final_permute_table], 96)
+pc1_tables = build_permutation_tables(pc1_table, 64)
+pc2_tables = build_permutation_tables(pc2_table, 56)
+sp_tables = build_sp_tables()
+round_tables = build_round_tables(sp_tables)
+
+# Translations between lists of 0/1 values and strings of '0'/'1' characters
+bit_characters = bytes.maketrans(b"\x00\x01", b"01")
+bit_values = bytes.maketrans(b"01", b"\x00\x01")
+
+def bits_to_int(bits):
+    """
+    Converts a list of bits to an integer.
+
+    Parameters:
+    - bits: the list of bits, the most significant bit first
+
+    Returns:
+    - The integer value of the bits
+    """
+    return int(bytes(bits).translate(bit_characters), 2) if bits else 0
+
+def int_to_bits(value, width):
+    """
+    Converts an integer to a list of bits.
+
+    Parameters:
+    - value: the integer
+    - width: the number of bits of the result
+
+    Returns:
+    - The list of bits, the most significant bit first
+    """
+    return list(format(value, f'0{width}b').encode().translate(bit_values))
+
+def int_key_schedule(key):
+    """
+    Generates the 16 round keys from a 64-bit integer key.
+
+    Parameters:
+    - key: the original key as a 64-bit integer
+
+    Returns:
+    - The list of the 16 round keys as 48-bit integers
+    """
+    key = permute_int(key, pc1_tables)
+    left_key = key >> 28
+    right_key = key & 0xfffffff
+
+    round_keys = []
+    for shift in key_shifts:
+        # Rotate the two 28-bit halves
+        left_key = ((left_key << shift) | (left_key >> (28 - shift))) & 0xfffffff
+        right_key = ((right_key << shift) | (right_key >> (28 - shift))) & 0xfffffff
+        round_keys.append(permute_int((left_key << 28) | right_key, pc2_tables))
+    return round_keys
+
+class DESKey:
+    """
+    Holds the round keys derived from a 64-bit key, so the key schedule only runs once per key.
+    The round keys are stored as 48-bit integers in arrays, the decryption ones already reversed.
+
+    Parameters:
+    - key: the key as a 64-bit integer
+    """
+    def __init__(self, key):
+        self.key = key
+        self.encryption_round_keys = array('Q', int_key_schedule(key))
+        self.decryption_round_keys = self.encryption_round_keys[::-1]
+
+# Maximum number of expanded keys kept in memory by get_des_key
+des_key_cache_size = 4096
+
+@functools.lru_cache(maxsize=des_key_cache_size)
+def cached_des_key(key):
+    """
+    Expands a key, keeping the most recently used expanded keys in a bounded LRU cache.
+
+    Parameters:
+    - key: the key as a 64-bit integer
+
+    Returns:
+    - The DESKey for the key
+    """
+    return DESKey(key)
+
+def get_des_key(key):
+    """
+    Returns the expanded key for a key, expanding it only if it is not in the cache.
+
+    Parameters:
+    - key: the key as a 64-bit integer, 8 bytes or a list of 64 bits, or a DESKey which is returned as it is
+
+    Raises:
+    - ValueError: Raises the exception if the key is not 64 bits
+
+    Returns:
+    - The DESKey for the key
+    """
+    if isinstance(key, DESKey):
+        return key
+    if isinstance(key, list):
+        if len(key) != 64:
+            raise ValueError("Invalid key length. The DES key must be 64-bit.")
+        key = bits_to_int(key)
+    elif not isinstance(key, int):
+        if len(key) != 8:
+            raise ValueError("Invalid key length. The DES key must be 64-bit.")
+        key = int.from_bytes(key, "big")
+    elif not 0 <= key < 1 << 64:
+        raise ValueError("Invalid key length. The DES key must be 64-bit.")
+    return cached_des_key(key)
+
+def des_key_cache_stats():
+    """
+    Reports how well the expanded key cache is doing.
+
+    Returns:
+    - A dictionary with the hits, misses, current size, maximum size and hit rate of the cache
+    """
+    info = cached_des_key.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+def int_des_block(block, round_keys):
+    """
+    Encrypts or decrypts one 64-bit block, depending on the order of the round keys. Several DES
+    runs can be chained by passing 16 round keys for each, as Triple DES does; the final and
+    initial permutations between the runs cancel out, so only the halves are swapped there.
+
+    Parameters:
+    - block: the block as a 64-bit integer
+    - round_keys: the 48-bit round keys from int_key_schedule, reversed for decryption
+
+    Returns:
+    - The processed block as a 64-bit integer
+    """
+    ip0, ip1, ip2, ip3, ip4, ip5, ip6, ip7 = ip_tables
+    t0, t1, t2, t3 = round_tables
+    block = (ip0[block >> 56] | ip1[(block >> 48) & 0xff] | ip2[(block >> 40) & 0xff] | ip3[(block >> 32) & 0xff] |
+             ip4[(block >> 24) & 0xff] | ip5[(block >> 16) & 0xff] | ip6[(block >> 8) & 0xff] | ip7[block & 0xff])
+    left = block >> 48 # Both halves are kept expanded to 48 bits
+    right = block & 0xffffffffffff
+
+    for start in range(0, len(round_keys), 16):
+        keys = iter(round_keys[start:start + 16])
+        for even_key, odd_key in zip(keys, keys):
+            # Two rounds at a time, so the halves only trade places once at the end
+            x = right ^ even_key
+            left ^= t0[x >> 36] | t1[(x >> 24) & 0xfff] | t2[(x >> 12) & 0xfff] | t3[x & 0xfff]
+            x = left ^ odd_key
+            right ^= t0[x >> 36] | t1[(x >> 24) & 0xfff] | t2[(x >> 12) & 0xfff] | t3[x & 0xfff]
+        left, right = right, left # Swap the halves at the end of each DES run
+
+    fp0, fp1, fp2, fp3, fp4, fp5, fp6, fp7, fp8, fp9, fp10, fp11 = fp_tables
+    block = (left << 48) | right
+    return (fp0[block >> 88] | fp1[(block >> 80) & 0xff] | fp2[(block >> 72) & 0xff] | fp3[(block >> 64) & 0xff] |
+            fp4[(block >> 56) & 0xff] | fp5[(block >> 48) & 0xff] | fp6[(block >> 40) & 0xff] | fp7[(block >> 32) & 0xff] |
+            fp8[(block >> 24) & 0xff] | fp9[(block >> 16) & 0xff] | fp10[(block >> 8) & 0xff] | fp11[block & 0xff])
+
+def int_des_process(blocks, key, decrypt=False):
+    """
+    Encrypts or decrypts a list of 64-bit integer blocks with the integer engine.
+
+    Parameters:
+    - blocks: the blocks as 64-bit integers
+    - key: the key as a 64-bit integer
+    - decrypt: True to decrypt instead of encrypting
+
+    Returns:
+    - The list of processed blocks
+    """
+    des_key = get_des_key(key)
+    round_keys = des_key.decryption_round_keys if decrypt else des_key.encryption_round_keys
+    return [int_des_block(block, round_keys) for block in blocks]
+
+def int_des_bits(bits, key, decrypt=False):
+    """
+    Runs the integer engine on a list of bits, converting the whole list at once.
+
+    Parameters:
+    - bits: the text as a list of bits, a multiple of 64 bits long
+    - key: the 64-bit key as a list of bits
+    - decrypt: True to decrypt instead of encrypting
+
+    Returns:
+    - The processed text as a list of bits
+    """
+    characters = bytes(bits).translate(bit_characters)
+    blocks = [int(characters[i:i + 64], 2) for i in range(0, len(characters), 64)]
+    processed = int_des_process(blocks, bits_to_int(key), decrypt)
+    return list(''.join(format(block, '064b') for block in processed).encode().translate(bit_values))
+
+def int_des_encrypt(plaintext, key):
+    """
+    Encrypts a list of bits like des_encrypt, with the integer engine.
+
+    Parameters:
+    - plaintext: the plaintext as a list of bits, a multiple of 64 bits long
+    - key: the 64-bit key as a list of bits
+
+    Returns:
+    - The ciphertext as a list of bits
+    """
+    return int_des_bits(plaintext, key)
+
+def int_des_decrypt(ciphertext, key):
+    """
+    Decrypts a list of bits like des_decrypt, with the integer engine.
+
+    Parameters:
+    - ciphertext: the ciphertext as a list of bits, a multiple of 64 bits long
+    - key: the 64-bit key as a list of bits
+
+    Returns:
+    - The decrypted text as a list of bits
+    """
+    return int_des_bits(ciphertext, key, decrypt=True)
+
+class TDEAKey:
+    """
+    Triple DES (TDEA) key with the encryption and decryption schedules expanded once. Encryption is
+    E(K3, D(K2, E(K1, block))) and decryption runs the three steps backwards.
+
+    The keying option follows from the length of the key:
+    - 24 bytes: option 1, three independent keys K1, K2 and K3
+    - 16 bytes: option 2, K1 and K2 with K3 = K1
+    - 8 bytes: option 3, K1 = K2 = K3, which is the same as single DES
+
+    Parameters:
+    - key: the key as bytes
+
+    Raises:
+    - ValueError: Raises the exception if the key is not 8, 16 or 24 bytes long
+    """
+    def __init__(self, key):
+        key = bytes(key)
+        if len(key) not in (8, 16, 24):
+            raise ValueError("Invalid key length. The Triple DES key must be 8, 16 or 24 bytes.")
+        self.keying_option = {24: 1, 16: 2, 8: 3}[len(key)]
+        if len(key) == 8:
+            key = key * 3
+        elif len(key) == 16:
+            key = key + key[:8] # K3 = K1
+        key_1, key_2, key_3 = struct.unpack(">3Q", key)
+        self.keys = (key_1, key_2, key_3)
+
+        des_key_1 = get_des_key(key_1)
+        des_key_2 = get_des_key(key_2)
+        des_key_3 = get_des_key(key_3)
+        # All 48 round keys of each direction in one array, run as three chained DES runs
+        self.encryption_round_keys = (des_key_1.encryption_round_keys + des_key_2.decryption_round_keys +
+                                      des_key_3.encryption_round_keys)
+        self.decryption_round_keys = (des_key_3.decryption_round_keys + des_key_2.encryption_round_keys +
+                                      des_key_1.decryption_round_keys)
+
+def tdea_process_blocks(key, data, decrypt=False):
+    """
+    Encrypts or decrypts many 8-byte blocks with Triple DES in a single call (ECB, without padding).
+
+    Parameters:
+    - key: a TDEAKey or the key as bytes
+    - data: bytes-like data, a multiple of 8 bytes long
+    - decrypt: True to decrypt instead of encrypting
+
+    Raises:
+    - ValueError: Raises the exception if the data is not a whole number of blocks
+
+    Returns:
+    - The processed blocks as bytes
+    """
+    if not isinstance(key, TDEAKey):
+        key = TDEAKey(key)
+    if len(data) % 8:
+        raise ValueError("Invalid data length. The data must be a multiple of 8 bytes.")
+    round_keys = key.decryption_round_keys if decrypt else key.encryption_round_keys
+    block_count = len(data) // 8
+    blocks = struct.unpack(f">{block_count}Q", data)
+    return struct.pack(f">{block_count}Q", *[int_des_block(block, round_keys) for block in blocks])
+
+def tdea_encrypt_blocks(key, data):
+    """
+    Encrypts many 8-byte blocks with Triple DES.
+
+    Parameters:
+    - key: a TDEAKey or the key as bytes
+    - data: bytes-like data, a multiple of 8 bytes long
+
+    Returns:
+    - The ciphertext as bytes
+    """
+    return tdea_process_blocks(key, data)
+
+def tdea_decrypt_blocks(key, data):
+    """
+    Decrypts many 8-byte blocks with Triple DES.
+
+    Parameters:
+    - key: a TDEAKey or the key as bytes
+    - data: bytes-like data, a multiple of 8 bytes long
+
+    Returns:
+    - The plaintext as bytes
+    """
+    return tdea_process_blocks(key, data, decrypt=True)
+
+# Layout of a DES block inside a byte buffer
+des_block_struct = struct.Struct(">Q")
+
+def des_key_schedules(key):
+    """
+    Gets the encryption and decryption round keys for the byte-level modes. An 8-byte key is
+    single DES and a 16- or 24-byte key is Triple DES.
+
+    Parameters:
+    - key: the key as bytes, or a DESKey or TDEAKey
+
+    Raises:
+    - ValueError: Raises the exception if the key has the wrong length
+
+    Returns:
+    - The encryption round keys and the decryption round keys
+    """
+    if isinstance(key, (DESKey, TDEAKey)):
+        return key.encryption_round_keys, key.decryption_round_keys
+    key = bytes(key)
+    if len(key) == 8:
+        des_key = get_des_key(key)
+        return des_key.encryption_round_keys, des_key.decryption_round_keys
+    if len(key) not in (16, 24):
+        raise ValueError("Invalid key length. The key must be 8 bytes for DES, or 16 or 24 bytes for Triple DES.")
+    tdea_key = TDEAKey(key)
+    return tdea_key.encryption_round_keys, tdea_key.decryption_round_keys
+
+def des_buffer(data, padding=False):
+    """
+    Copies the input into the preallocated buffer the modes work in, adding PKCS#7 padding if asked.
+
+    Parameters:
+    - data: any bytes-like object
+    - padding: True to pad the data to a whole number of blocks
+
+    Raises:
+    - ValueError: Raises the exception if the data is not a whole number of blocks without padding
+
+    Returns:
+    - The buffer as a bytearray
+    """
+    source = memoryview(data).cast("B")
+    length = len(source)
+    if not padding:
+        if length % 8:
+            raise ValueError("Invalid data length. Without padding the data must be a multiple of 8 bytes.")
+        return bytearray(source)
+    padding_length = 8 - length % 8
+    buffer = bytearray(length + padding_length)
+    buffer[:length] = source
+    buffer[length:] = bytes([padding_length]) * padding_length
+    return buffer
+
+def des_unpad(buffer):
+    """
+    Checks and removes the PKCS#7 padding in place.
+
+    Parameters:
+    - buffer: the decrypted bytearray
+
+    Raises:
+    - ValueError: Raises the exception if the padding is not valid
+
+    Returns:
+    - The buffer without the padding
+    """
+    padding_length = buffer[-1] if buffer else 0
+    if not 1 <= padding_length <= 8 or buffer[-padding_length:] != bytes([padding_length]) * padding_length:
+        raise ValueError("Invalid padding. The key or the ciphertext is wrong.")
+    del buffer[-padding_length:]
+    return buffer
+
+def des_iv(iv):
+    """
+    Reads an 8-byte IV or nonce as an integer.
+
+    Parameters:
+    - iv: the IV as bytes
+
+    Raises:
+    - ValueError: Raises the exception if the IV is not 8 bytes long
+
+    Returns:
+    - The IV as a 64-bit integer
+    """
+    if len(iv) != 8:
+        raise ValueError("Invalid IV length. The IV must be 8 bytes.")
+    return int.from_bytes(iv, "big")
+
+def des_ecb_process(buffer, round_keys):
+    """
+    Encrypts or decrypts every block of a buffer in place.
+
+    Parameters:
+    - buffer: a bytearray holding a whole number of blocks
+    - round_keys: the round keys from des_key_schedules
+
+    Returns:
+    - The buffer
+    """
+    unpack_from = des_block_struct.unpack_from
+    pack_into = des_block_struct.pack_into
+    for offset in range(0, len(buffer), 8):
+        pack_into(buffer, offset, int_des_block(unpack_from(buffer, offset)[0], round_keys))
+    return buffer
+
+def des_ecb_encrypt(key, data, padding=True):
+    """
+    Encrypts bytes with DES or Triple DES in ECB mode.
+
+    Parameters:
+    - key: an 8-byte DES key, a 16- or 24-byte Triple DES key, or a DESKey or TDEAKey
+    - data: any bytes-like object
+    - padding: True to add PKCS#7 padding, False if the data is already a whole number of blocks
+
+    Raises:
+    - ValueError: Raises the exception if the key or the data length are not valid
+
+    Returns:
+    - The ciphertext as a bytearray
+    """
+    encryption_keys, _ = des_key_schedules(key)
+    return des_ecb_process(des_buffer(data, padding), encryption_keys)
+
+def des_ecb_decrypt(key, data, padding=True):
+    """
+    Decrypts bytes with DES or Triple DES in ECB mode.
+
+    Parameters:
+    - key: an 8-byte DES key, a 16- or 24-byte Triple DES key, or a DESKey or TDEAKey
+    - data: any bytes-like object, a multiple of 8 bytes long
+    - padding: True to check and remove PKCS#7 padding
+
+    Raises:
+    - ValueError: Raises the exception if the key, the data length or the padding are not valid
+
+    Returns:
+    - The plaintext as a bytearray
+    """
+    _, decryption_keys = des_key_schedules(key)
+    buffer = des_ecb_process(des_buffer(data), decryption_keys)
+    return des_unpad(buffer) if padding else buffer
+
+def des_cbc_encrypt(key, iv, data, padding=True):
+    """
+    Encrypts bytes with DES or Triple DES in CBC mode.
+
+    Parameters:
+    - key: an 8-byte DES key, a 16- or 24-byte Triple DES key, or a DESKey or TDEAKey
+    - iv: the 8-byte IV
+    - data: any bytes-like object
+    - padding: True to add PKCS#7 padding, False if the data is already a whole number of blocks
+
+    Raises:
+    - ValueError: Raises the exception if the key, the IV or the data length are not valid
+
+    Returns:
+    - The ciphertext as a bytearray
+    """
+    encryption_keys, _ = des_key_schedules(key)
+    previous = des_iv(iv)
+    buffer = des_buffer(data, padding)
+    unpack_from = des_block_struct.unpack_from
+    pack_into = des_block_struct.pack_into
+    for offset in range(0, len(buffer), 8):
+        previous = int_des_block(unpack_from(buffer, offset)[0] ^ previous, encryption_keys)
+        pack_into(buffer, offset, previous)
+    return buffer
+
+def des_cbc_decrypt(key, iv, data, padding=True):
+    """
+    Decrypts bytes with DES or Triple DES in CBC mode.
+
+    Parameters:
+    - key: an 8-byte DES key, a 16- or 24-byte Triple DES key, or a DESKey or TDEAKey
+    - iv: the 8-byte IV
+    - data: any bytes-like object, a multiple of 8 bytes long
+    - padding: True to check and remove PKCS#7 padding
+
+    Raises:
+    - ValueError: Raises the exception if the key, the IV, the data length or the padding are not valid
+
+    Returns:
+    - The plaintext as a bytearray
+    """
+    _, decryption_keys = des_key_schedules(key)
+    previous = des_iv(iv)
+    buffer = des_buffer(data)
+    unpack_from = des_block_struct.unpack_from
+    pack_into = des_block_struct.pack_into
+    for offset in range(0, len(buffer), 8):
+        block = unpack_from(buffer, offset)[0]
+        pack_into(buffer, offset, int_des_block(block, decryption_keys) ^ previous)
+        previous = block
+    return des_unpad(buffer) if padding else buffer
+
+def des_ctr(key, nonce, data):
+    """
+    Encrypts or decrypts bytes with DES or Triple DES in CTR mode. The counter block starts as the
+    nonce and is incremented as a 64-bit big-endian integer for every block, so no padding is needed.
+
+    Parameters:
+    - key: an 8-byte DES key, a 16- or 24-byte Triple DES key, or a DESKey or TDEAKey
+    - nonce: the 8-byte initial counter block
+    - data: any bytes-like object
+
+    Raises:
+    - ValueError: Raises the exception if the key or the nonce are not valid
+
+    Returns:
+    - The processed data as a bytearray
+    """
+    encryption_keys, _ = des_key_schedules(key)
+    counter = des_iv(nonce)
+    buffer = bytearray(memoryview(data).cast("B"))
+    full_length = len(buffer) - len(buffer) % 8
+    unpack_from = des_block_struct.unpack_from
+    pack_into = des_block_struct.pack_into
+    for offset in range(0, full_length, 8):
+        pack_into(buffer, offset, unpack_from(buffer, offset)[0] ^ int_des_block(counter, encryption_keys))
+        counter = (counter + 1) & 0xffffffffffffffff
+    if full_length < len(buffer):
+        # The last partial block uses the start of one more keystream block
+        keystream = des_block_struct.pack(int_des_block(counter, encryption_keys))
+        for offset in range(full_length, len(buffer)):
+            buffer[offset] ^= keystream[offset - full_length]
+    return buffer
+
+def build_sbox_circuit(s_box):
+    """
+    Builds a boolean gate circuit for an S-box from its truth table, for the bitsliced engine.
+    The six inputs go through two 3-bit decoders, and every output bit is the OR, over the values
+    of the first three inputs, of that decoder term ANDed with the OR of the matching low terms.
+
+    Wires 0-5 are the inputs (in the order of the S-box input bits) and wire 6 is all ones, and
+    every gate appends a new wire.
+
+    Parameters:
+    - s_box: the S-box as 4 rows of 16 values
+
+    Returns:
+    - The list of gates as (function, first wire, second wire) and the wires of the 4 output bits
+    """
+    gates = []
+    def gate(function, first, second):
+        gates.append((function, first, second))
+        return 6 + len(gates)
+
+    ones = 6
+    inverted = [gate(operator.xor, i, ones) for i in range(6)]
+    literals = [(inverted[i], i) for i in range(6)] # Wire for each input being 0 or 1
+
+    def decoder(first_input):
+        # One wire for each value of three inputs, the first input being the most significant bit
+        terms = [gate(operator.and_, literals[first_input][a], literals[first_input + 1][b]) for a in range(2) for b in range(2)]
+        return [gate(operator.and_, terms[v >> 1], literals[first_input + 2][v & 1]) for v in range(8)]
+    high_terms = decoder(0)
+    low_terms = decoder(3)
+
+    subsets = {}
+    def low_subset(values):
+        # OR of the low terms for a set of values, from the complement when that is shorter
+        if values not in subsets:
+            chosen = sorted(values) if len(values) <= 4 else sorted(set(range(8)) - values)
+            wire = low_terms[chosen[0]] if chosen else None
+            for value in chosen[1:]:
+                wire = gate(operator.or_, wire, low_terms[value])
+            if len(values) > 4:
+                wire = gate(operator.xor, wire, ones) if chosen else ones
+            subsets[values] = wire
+        return subsets[values]
+
+    outputs = []
+    for output_bit in range(4):
+        output = None
+        for high in range(8):
+            values = frozenset(low for low in range(8) if (s_box[((high >> 1) & 2) | (low & 1)][((high & 3) << 2) | (low >> 1)] >> (3 - output_bit)) & 1)
+            if not values:
+                continue
+            term = high_terms[high] if len(values) == 8 else gate(operator.and_, high_terms[high], low_subset(values))
+            output = term if output is None else gate(operator.or_, output, term)
+        outputs.append(output)
+    return gates, outputs
+
+def evaluate_circuit(circuit, inputs, ones):
+    """
+    Evaluates a gate circuit on bitsliced words.
+
+    Parameters:
+    - circuit: the gates and output wires from build_sbox_circuit
+    - inputs: the 6 input words
+    - ones: the word with every instance bit set
+
+    Returns:
+    - The list of the 4 output words
+    """
+    gates, outputs = circuit
+    wires = inputs + [ones]
+    append = wires.append
+    for function, first, second in gates:
+        append(function(wires[first], wires[second]))
+    return [wires[wire] for wire in outputs]
+
+# Number of DES instances packed into each word by batch_process; wider words stop paying off past this
+bitslice_width = 16384
+
+# Gate circuits of the S-boxes, and the key bit (0-63) behind every bit of every round key
+sbox_circuits = [build_sbox_circuit(s_box) for s_box in s_boxes]
+round_key_positions = key_schedule(list(range(64)))
+
+def bitslice_transpose(values, count):
+    """
+    Turns 64-bit values into 64 bitsliced words, where bit i of word j is bit j (counted from the
+    most significant bit) of value i. A single value is repeated for all the instances.
+
+    Parameters:
+    - values: the list of 64-bit integers
+    - count: the number of instances
+
+    Returns:
+    - The list of 64 words
+    """
+    if len(values) == 1:
+        ones = (1 << count) - 1
+        return [ones if bit == '1' else 0 for bit in format(values[0], '064b')]
+    # The last value goes first, so the first value ends up in the lowest bit of every word
+    text = ''.join(map('{:064b}'.format, reversed(values)))
+    return [int(text[j::64], 2) for j in range(64)]
+
+def bitslice_untranspose(words, count):
+    """
+    Turns 64 bitsliced words back into 64-bit values.
+
+    Parameters:
+    - words: the list of 64 words
+    - count: the number of instances
+
+    Returns:
+    - The list of 64-bit integers, one per instance
+    """
+    text = bytearray(64 * count)
+    for j, word in enumerate(words):
+        text[j::64] = format(word, f'0{count}b').encode() # Every 64 characters hold one value, the last one first
+    values = struct.unpack(f'>{count}Q', int(text, 2).to_bytes(8 * count, 'big'))
+    return list(reversed(values))
+
+def bitslice_des(key_words, block_words, ones, decrypt=False):
+    """
+    Runs DES on bitsliced words, so every bit position of the words is an independent DES instance.
+
+    Parameters:
+    - key_words: the 64 words of the keys, the most significant key bit first
+    - block_words: the 64 words of the blocks, the most significant block bit first
+    - ones: the word with every instance bit set
+    - decrypt: True to decrypt instead of encrypting
+
+    Returns:
+    - The list of the 64 words of the processed blocks
+    """
+    round_keys = [[key_words[position] for position in positions] for positions in round_key_positions]
+    if decrypt:
+        round_keys.reverse()
+
+    block = [block_words[i - 1] for i in initial_permute_table]
+    left = block[:32]
+    right = block[32:]
+    for round_key in round_keys:
+        x = [right[i - 1] ^ key_word for i, key_word in zip(expansion_table, round_key)]
+        substituted = []
+        for s, circuit in enumerate(sbox_circuits):
+            substituted += evaluate_circuit(circuit, x[6 * s:6 * s + 6], ones)
+        left, right = right, [word ^ substituted[i - 1] for word, i in zip(left, permutation_table)]
+
+    block = right + left # Swap the halves before permutation
+    return [block[i - 1] for i in final_permute_table]
+
+def batch_process(keys, blocks, decrypt=False):
+    """
+    Encrypts or decrypts many blocks, each with its own key, with the bitsliced engine.
+
+    Parameters:
+    - keys: the keys as 64-bit integers, or a single key for all the blocks
+    - blocks: the blocks as 64-bit integers, or a single block for all the keys
+
+    Raises:
+    - ValueError: Raises the exception if the numbers of keys and blocks do not match
+
+    Returns:
+    - The list of processed blocks
+    """
+    total = max(len(keys), len(blocks))
+    if len(keys) not in (1, total) or len(blocks) not in (1, total):
+        raise ValueError("The number of keys and blocks must match, unless one of them is a single value.")
+
+    results = []
+    for start in range(0, total, bitslice_width):
+        count = min(bitslice_width, total - start)
+        key_chunk = keys if len(keys) == 1 else keys[start:start + count]
+        block_chunk = blocks if len(blocks) == 1 else blocks[start:start + count]
+        words = bitslice_des(bitslice_transpose(key_chunk, count), bitslice_transpose(block_chunk, count),
+                             (1 << count) - 1, decrypt)
+        results += bitslice_untranspose(words, count)
+    return results
+
+def batch_encrypt(keys, blocks):
+    """
+    Encrypts many blocks, each with its own key, with the bitsliced engine.
+
+    Parameters:
+    - keys: the keys as 64-bit integers, or a single key for all the blocks
+    - blocks: the blocks as 64-bit integers, or a single block for all the keys
+
+    Returns:
+    - The list of ciphertext blocks
+    """
+    return batch_process(keys, blocks)
+
+def batch_decrypt(keys, blocks):
+    """
+    Decrypts many blocks, each with its own key, with the bitsliced engine.
+
+    Parameters:
+    - keys: the keys as 64-bit integers, or a single key for all the blocks
+    - blocks: the blocks as 64-bit integers, or a single block for all the keys
+
+    Returns:
+    - The list of plaintext blocks
+    """
+    return batch_process(keys, blocks, decrypt=True)
+
+def benchmark_key_testing(key_count=4096, reference_count=16):
+    """
+    Measures how many keys per second each engine tests on one known block, including the key setup.
+
+    Parameters:
+    - key_count: the number of keys for the integer and bitsliced engines
+    - reference_count: the number of keys for the slow bit-list engine
+
+    Returns:
+    - A dictionary with the keys per second of each engine
+    """
+    keys = [int.from_bytes(os.urandom(8), "big") for _ in range(key_count)]
+    block = 0x0123456789ABCDEF
+    block_bits = int_to_bits(block, 64)
+    results = {}
+
+    start_time = time.perf_counter()
+    for key in keys[:reference_count]:
+        des_block_processing([block_bits], key_schedule(int_to_bits(key, 64)))
+    results["des_block_processing"] = reference_count / (time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    for key in keys:
+        int_des_block(block, int_key_schedule(key))
+    results["integer"] = key_count / (time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    batch_encrypt(keys, [block])
+    results["bitsliced"] = key_count / (time.perf_counter() - start_time)
+    return results
+
 def main():
     # 64 bit Plaintext as example for an input.
     plaintext = [0, 0, 1, 0, 0, 1, 0, 1, 0, 1, 1, 0, 0, 0, 1, 1,  
@@ -356,6 +1218,8 @@ def main():
     
     # Decrypt the ciphertext.
     decrypted_ciphertext = des_decrypt(encrypted_ciphertext, key)
+    print("Integer engine matches:", int_des_encrypt(plaintext, key) == encrypted_ciphertext and
+          int_des_decrypt(encrypted_ciphertext, key) == decrypted_ciphertext == plaintext)
     encrypted_ciphertext = int(''.join(map(str, encrypted_ciphertext)))
     print("Ciphertext:", encrypted_ciphertext)
     decrypted_ciphertext = int(''.join(map(str, decrypted_ciphertext)))
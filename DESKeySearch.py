@@ -0,0 +1,376 @@
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from DES import (bitslice_width, evaluate_circuit, expansion_table, initial_permute_table, int_des_block,
+                 int_key_schedule, permutation_table, round_key_positions, sbox_circuits)
+
+# DES ignores the lowest bit of every key byte, so those bits are never searched
+parity_mask = 0x0101010101010101
+
+# Number of candidate keys in each task sent to the workers
+default_chunk_size = 1 << 18
+
+# Seconds between checkpoint writes
+checkpoint_interval = 10.0
+
+# Position of every S-box output bit after the permutation P
+p_positions = [permutation_table.index(i + 1) for i in range(32)]
+
+def unknown_positions(unknown_mask):
+    """
+    Lists the key bits that have to be searched, leaving out the parity bits.
+
+    Parameters:
+    - unknown_mask: 64-bit integer with the unknown key bits set
+
+    Returns:
+    - The list of bit positions (0 is the least significant bit), the lowest first
+    """
+    unknown_mask &= ~parity_mask
+    return [position for position in range(64) if (unknown_mask >> position) & 1]
+
+def candidate_key(known_key, positions, index):
+    """
+    Builds the candidate key with a given index by spreading the bits of the index over the unknown positions.
+
+    Parameters:
+    - known_key: the key with the known bits set, as a 64-bit integer
+    - positions: the unknown bit positions
+    - index: the index of the candidate
+
+    Returns:
+    - The candidate key as a 64-bit integer
+    """
+    key = known_key
+    for bit, position in enumerate(positions):
+        if (index >> bit) & 1:
+            key |= 1 << position
+        else:
+            key &= ~(1 << position)
+    return key
+
+def counting_pattern(bit, width):
+    """
+    Builds the word whose instance i holds bit number `bit` of i, so the instances of a word count upwards.
+
+    Parameters:
+    - bit: the bit of the instance number
+    - width: the number of instances in the word, a power of two
+
+    Returns:
+    - The word as an integer
+    """
+    period = 2 << bit
+    pattern = ((1 << (1 << bit)) - 1) << (1 << bit) # Half a period of zeros, then half a period of ones
+    while period < width:
+        pattern |= pattern << period
+        period *= 2
+    return pattern & ((1 << width) - 1)
+
+def candidate_key_words(known_key, positions, base, width, patterns):
+    """
+    Builds the bitsliced key words for `width` consecutive candidates starting at an aligned index,
+    without going through a transposition.
+
+    Parameters:
+    - known_key: the key with the known bits set, as a 64-bit integer
+    - positions: the unknown bit positions
+    - base: the index of the first candidate, a multiple of width
+    - width: the number of instances in each word, a power of two
+    - patterns: the counting patterns for the low bits of the candidate index
+
+    Returns:
+    - The 64 key words, the most significant key bit first
+    """
+    ones = (1 << width) - 1
+    words = [ones if (known_key >> (63 - i)) & 1 else 0 for i in range(64)]
+    for bit, position in enumerate(positions):
+        if bit < len(patterns):
+            words[63 - position] = patterns[bit] # Changes from one instance to the next
+        else:
+            words[63 - position] = ones if (base >> bit) & 1 else 0 # The same for the whole word
+    return words
+
+def matching_instances(key_words, plaintext_words, target, ones):
+    """
+    Runs bitsliced DES and compares the last two rounds with the expected halves S-box by S-box,
+    giving up as soon as no instance matches. A wrong key is almost always rejected after the
+    first few S-boxes of round 15, so the last round is hardly ever computed.
+
+    Parameters:
+    - key_words: the 64 key words
+    - plaintext_words: the 64 plaintext words
+    - target: the bits of the ciphertext after the initial permutation, as the right halves
+      expected after rounds 15 and 16
+    - ones: the word with every instance bit set
+
+    Returns:
+    - The word with the bits of the matching instances set, 0 if none matched
+    """
+    round_keys = [[key_words[position] for position in positions] for positions in round_key_positions]
+    block = [plaintext_words[i - 1] for i in initial_permute_table]
+    left = block[:32]
+    right = block[32:]
+    for round_key in round_keys[:14]:
+        x = [right[i - 1] ^ key_word for i, key_word in zip(expansion_table, round_key)]
+        substituted = []
+        for s, circuit in enumerate(sbox_circuits):
+            substituted += evaluate_circuit(circuit, x[6 * s:6 * s + 6], ones)
+        left, right = right, [word ^ substituted[i - 1] for word, i in zip(left, permutation_table)]
+
+    match = ones
+    for round_key, expected in zip(round_keys[14:], target):
+        x = [right[i - 1] ^ key_word for i, key_word in zip(expansion_table, round_key)]
+        new_right = list(left)
+        for s, circuit in enumerate(sbox_circuits):
+            for output_bit, word in enumerate(evaluate_circuit(circuit, x[6 * s:6 * s + 6], ones)):
+                position = p_positions[4 * s + output_bit]
+                new_right[position] ^= word
+                match &= new_right[position] if expected[position] else new_right[position] ^ ones
+            if not match:
+                return 0 # Early abort: no candidate in this word can be the key
+        left, right = right, new_right
+    return match
+
+def search_chunk(plaintext, ciphertext, known_key, positions, start, count, stop_event=None):
+    """
+    Tests a range of candidate keys. This is the task run by every worker.
+
+    Parameters:
+    - plaintext: the known plaintext block as a 64-bit integer
+    - ciphertext: the matching ciphertext block as a 64-bit integer
+    - known_key: the key with the known bits set
+    - positions: the unknown bit positions
+    - start: the index of the first candidate, a multiple of the word width
+    - count: the number of candidates
+    - stop_event: an optional event that stops the search when set
+
+    Returns:
+    - The list of keys that produced the ciphertext, and whether the whole range was tested
+    """
+    width = min(bitslice_width, 1 << len(positions))
+    low_bits = width.bit_length() - 1
+    patterns = [counting_pattern(bit, width) for bit in range(low_bits)]
+    ones = (1 << width) - 1
+    plaintext_words = [ones if (plaintext >> (63 - i)) & 1 else 0 for i in range(64)]
+
+    # The ciphertext after the initial permutation holds the right halves after rounds 16 and 15
+    ciphertext_bits = [(ciphertext >> (63 - i)) & 1 for i in range(64)]
+    permuted = [ciphertext_bits[i - 1] for i in initial_permute_table]
+    target = [permuted[32:], permuted[:32]]
+
+    # Indices past the search space would wrap around the unknown bits and test keys again
+    end = min(start + count, 1 << len(positions))
+    matches = []
+    for base in range(start, end, width):
+        if stop_event is not None and stop_event.is_set():
+            return matches, False
+        key_words = candidate_key_words(known_key, positions, base, width, patterns)
+        match = matching_instances(key_words, plaintext_words, target, ones)
+        while match:
+            instance = (match & -match).bit_length() - 1
+            match &= match - 1
+            key = candidate_key(known_key, positions, base + instance)
+            if int_des_block(plaintext, int_key_schedule(key)) == ciphertext: # Confirm with the integer engine
+                matches.append(key)
+    return matches, True
+
+def save_checkpoint(path, state):
+    """
+    Writes the checkpoint atomically, so an interruption never leaves a half-written file.
+
+    Parameters:
+    - path: the path of the checkpoint file
+    - state: the dictionary to store as JSON
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+def load_checkpoint(path, parameters):
+    """
+    Reads a checkpoint, checking it belongs to the same search.
+
+    Parameters:
+    - path: the path of the checkpoint file
+    - parameters: the dictionary describing the search
+
+    Raises:
+    - ValueError: Raises the exception if the checkpoint is for a different search
+
+    Returns:
+    - The stored state, or None if the file does not exist
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as checkpoint_file:
+        state = json.load(checkpoint_file)
+    if state.get("parameters") != parameters:
+        raise ValueError("The checkpoint file belongs to a different search.")
+    return state
+
+def search_key(plaintext, ciphertext, known_key, unknown_mask, workers=None, chunk_size=default_chunk_size,
+               checkpoint=None, progress=None):
+    """
+    Searches the unknown bits of a DES key using a known plaintext and ciphertext pair. The search
+    space is split into chunks that run in a process pool, every chunk is tested with the
+    bitsliced engine, and the workers stop as soon as the key is found.
+
+    Parameters:
+    - plaintext: the known plaintext block as a 64-bit integer
+    - ciphertext: the matching ciphertext block as a 64-bit integer
+    - known_key: the key with the known bits set, as a 64-bit integer (its parity bits are kept)
+    - unknown_mask: 64-bit integer with the unknown key bits set
+    - workers: the number of worker processes, defaults to the number of CPUs, 1 runs in this process
+    - chunk_size: the number of candidates in each task, rounded to a multiple of the word width
+    - checkpoint: an optional path of a JSON file used to save and resume the progress
+    - progress: an optional function called with the number of keys tested, the total and the keys per second
+
+    Raises:
+    - ValueError: Raises the exception if the checkpoint belongs to a different search
+
+    Returns:
+    - The key as a 64-bit integer, or None if no key matches
+    """
+    positions = unknown_positions(unknown_mask)
+    total = 1 << len(positions)
+    width = min(bitslice_width, total)
+    chunk_size = min(max(width, chunk_size // width * width), total)
+    chunk_count = (total + chunk_size - 1) // chunk_size
+
+    parameters = {"plaintext": f"{plaintext:016x}", "ciphertext": f"{ciphertext:016x}",
+                  "known_key": f"{known_key:016x}", "unknown_mask": f"{unknown_mask & ~parity_mask:016x}",
+                  "chunk_size": chunk_size}
+    state = load_checkpoint(checkpoint, parameters) or {"parameters": parameters, "completed_below": 0,
+                                                        "completed": [], "key": None}
+    if state["key"] is not None:
+        return int(state["key"], 16)
+
+    # Chunks below completed_below are all done, the ones listed in completed finished out of order
+    completed = set(state["completed"])
+    remaining = (chunk for chunk in range(state["completed_below"], chunk_count) if chunk not in completed)
+    tested = (state["completed_below"] + len(completed)) * chunk_size
+    start_time = time.perf_counter()
+    last_save = start_time
+    resumed = tested
+    found = []
+
+    def chunk_length(chunk):
+        # The last chunk stops at the end of the search space, still a multiple of the word width
+        return min(chunk_size, total - chunk * chunk_size)
+
+    def record(chunk, matches, finished):
+        nonlocal tested, last_save
+        found.extend(key for key in matches if key not in found)
+        if finished:
+            completed.add(chunk)
+            while state["completed_below"] in completed:
+                completed.remove(state["completed_below"])
+                state["completed_below"] += 1
+            tested += chunk_length(chunk)
+        if matches:
+            state["key"] = f"{matches[0]:016x}"
+        if progress is not None:
+            elapsed = time.perf_counter() - start_time
+            progress(min(tested, total), total, (tested - resumed) / elapsed if elapsed else 0.0)
+        if checkpoint and (matches or time.perf_counter() - last_save >= checkpoint_interval):
+            state["completed"] = sorted(completed)
+            save_checkpoint(checkpoint, state)
+            last_save = time.perf_counter()
+
+    task = (plaintext, ciphertext, known_key, positions)
+    workers = workers or os.cpu_count() or 1
+    try:
+        if workers == 1 or chunk_count < 2:
+            stop_event = threading.Event()
+            for chunk in remaining:
+                record(chunk, *search_chunk(*task, chunk * chunk_size, chunk_length(chunk), stop_event))
+                if found:
+                    break
+        else:
+            with multiprocessing.Manager() as manager, \
+                 concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                stop_event = manager.Event()
+                pending = {}
+                while not found:
+                    # Keep a bounded number of chunks in flight instead of submitting the whole space
+                    for chunk in remaining:
+                        pending[executor.submit(search_chunk, *task, chunk * chunk_size, chunk_length(chunk), stop_event)] = chunk
+                        if len(pending) >= 2 * workers:
+                            break
+                    if not pending:
+                        break
+                    done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        record(pending.pop(future), *future.result())
+                if found:
+                    stop_event.set() # Cancel the chunks that are still running
+                    for future in pending:
+                        future.cancel()
+    finally:
+        if checkpoint:
+            state["completed"] = sorted(completed)
+            save_checkpoint(checkpoint, state)
+    return found[0] if found else None
+
+def print_progress(tested, total, keys_per_second):
+    """
+    Prints the progress of a search on one line of stderr.
+
+    Parameters:
+    - tested: the number of keys tested
+    - total: the number of keys in the search space
+    - keys_per_second: the current search speed
+    """
+    print(f"\r{tested}/{total} keys ({100 * tested / total:.1f}%), {keys_per_second:,.0f} keys/sec",
+          end="", file=sys.stderr, flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the unknown bits of a DES key with a known plaintext.")
+    parser.add_argument("--plaintext", help="the known plaintext block in hexadecimal")
+    parser.add_argument("--ciphertext", help="the matching ciphertext block in hexadecimal")
+    parser.add_argument("--key", help="the key with the known bits set, in hexadecimal")
+    parser.add_argument("--unknown-mask", help="the unknown key bits as a hexadecimal mask")
+    parser.add_argument("--workers", type=int, help="the number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=default_chunk_size, help="the number of keys in each task")
+    parser.add_argument("--checkpoint", help="JSON file to save the progress to and resume from")
+    args = parser.parse_args()
+
+    search_options = {"--plaintext": args.plaintext, "--ciphertext": args.ciphertext, "--key": args.key,
+                      "--unknown-mask": args.unknown_mask}
+    if any(value is not None for value in search_options.values()):
+        missing = [option for option, value in search_options.items() if value is None]
+        if missing:
+            parser.error(f"a search also needs {', '.join(missing)}")
+
+    if args.plaintext is None:
+        # Example: hide the last three bytes (21 bits without parity) of a random key and find them again
+        secret_key = int.from_bytes(os.urandom(8), "big")
+        plaintext = 0x0123456789ABCDEF
+        ciphertext = int_des_block(plaintext, int_key_schedule(secret_key))
+        unknown_mask = 0xFEFEFE
+        known_key = secret_key & ~unknown_mask
+        print(f"Secret key: {secret_key:016x}, unknown mask: {unknown_mask:016x}")
+    else:
+        try:
+            plaintext, ciphertext, known_key, unknown_mask = (int(value, 16) for value in search_options.values())
+        except ValueError:
+            parser.error("The plaintext, the ciphertext, the key and the unknown mask must be hexadecimal.")
+        if not all(0 <= value < 1 << 64 for value in (plaintext, ciphertext, known_key, unknown_mask)):
+            parser.error("The plaintext, the ciphertext, the key and the unknown mask must be 64-bit values.")
+
+    key = search_key(plaintext, ciphertext, known_key, unknown_mask, args.workers, args.chunk_size,
+                     args.checkpoint, print_progress)
+    print(file=sys.stderr)
+    print(f"Key found: {key:016x}" if key is not None else "No key matches.")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from PrimalityTests import miller_rabin_primality_test
-from affine_cipher import mod_inverse
+from NumberTheory import mod_inverse
 from SquareAndMultipy import square_and_multiply
 from RSAWithKeyGeneration import generate_prime
 import random
@@ -88,9 +88,10 @@ def elgamal_decrypt(delta, Beta, p, k_priv, alpha):
     - The decrypted message
     """
     s = square_and_multiply(delta, k_priv, p)
-    s_inv = mod_inverse(s, p)
-    if s_inv is None:
-        raise ValueError("The modular inverse does not exist.")
+    try:
+        s_inv = mod_inverse(s, p)
+    except ValueError:
+        raise ValueError("The modular inverse does not exist.") from None
     message = (Beta * s_inv) % p
     return message
 
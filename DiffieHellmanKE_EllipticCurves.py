@@ -1,4 +1,5 @@
 import random 
+from NumberTheory import mod_inverse
 
 def point_addition(P, Q, a, b, p):
     """
@@ -21,9 +22,9 @@ def point_addition(P, Q, a, b, p):
     x2, y2 = Q
      
     if x1 == x2 and y1 == y2:
-        beta = (3*x1*x2 + a) * pow(2*y1, -1, p)
+        beta = (3*x1*x2 + a) * mod_inverse(2*y1, p)
     else:
-        beta = (y2 - y1) * pow(x2 - x1, -1, p)
+        beta = (y2 - y1) * mod_inverse(x2 - x1, p)
      
     x3 = (beta*beta - x1 - x2) % p
     y3 = (beta * (x1 - x3) - y1) % p
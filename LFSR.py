@@ -1,3 +1,50 @@
+import concurrent.futures
+import os
+import sys
+from array import array
+
+# Array type codes for the supported word sizes of the LFSR class
+word_typecodes = {8: 'B', 16: 'H', 32: 'I', 64: 'Q'}
+
+# The output bits of every byte value, the first bit being the least significant one
+byte_bits = [format(value, '08b')[::-1] for value in range(256)]
+
+# Number of keystream bytes each worker of parallel_keystream produces at a time
+lfsr_segment_size = 1 << 20
+
+def gf2_matrix_apply(columns, vector):
+    """
+    Multiplies a GF(2) matrix by a vector, the matrix being a list of columns packed into integers.
+
+    Parameters:
+    - columns: the columns of the matrix, column i being the image of bit i
+    - vector: the vector as an integer
+
+    Returns:
+    - The product as an integer
+    """
+    result = 0
+    for column in columns:
+        if not vector:
+            break
+        if vector & 1:
+            result ^= column
+        vector >>= 1
+    return result
+
+def gf2_matrix_multiply(a, b):
+    """
+    Multiplies two GF(2) matrices given as columns.
+
+    Parameters:
+    - a: the columns of the left matrix
+    - b: the columns of the right matrix
+
+    Returns:
+    - The columns of the product, which applies b then a
+    """
+    return [gf2_matrix_apply(a, column) for column in b]
+
 def lfsr(initial_state, polynomial_degree, cycles):
     """
     Generates a pseudo-random key using Linea Feedback Shift Register (LFSR). 
@@ -10,18 +57,346 @@ def lfsr(initial_state, polynomial_degree, cycles):
     Returns:
     The Pseudo-random key generated by the LFSR
     """
-    state = list(initial_state) # Converts the initial state to a list.
-    key = '' # Initialize an empty string to store the key
-    
-    for _ in range(cycles):
-        feedback = int(state[-1]) # Assigns the variable 'feedback' the Right most bit.
-        for i in range (1, polynomial_degree):
-            feedback ^= int(state[-(i + 1)]) # Performs XOR operation for feedback from other flip-flops
-        state.pop() # Removes the rightmost bit
-        state.insert(0, str(feedback)) # Inserts the feedback bit at the beginning.
-        key += state[-1] # Appends the rightmost bit to key.
-    
-    return key
+    if cycles <= 0:
+        return ''
+
+    # The last bit is the rightmost flip-flop, feeding back together with the ones before it
+    state = int(initial_state, 2)
+    taps = (1 << max(polynomial_degree, 1)) - 1
+    register = LFSR(state, taps=taps, degree=len(initial_state), word_bits=8)
+
+    # The key starts with the bit shifted out by the first cycle, so one more bit is generated and dropped
+    return register.bits(cycles + 1)[1:]
+
+class LFSR:
+    """
+    Linear Feedback Shift Register with its state held in an integer. Bit 0 of the state is the next
+    output bit, and each cycle shifts the state right, the feedback (the parity of the tapped bits)
+    entering at the top. The keystream is produced a whole word at a time through byte-step tables,
+    so one step costs one table lookup per byte of the state.
+
+    Parameters:
+    - state: the initial state, as an integer or as little-endian bytes
+    - taps: the mask of the state bits fed back, bit i being the coefficient of x^i
+    - polynomial: the feedback polynomial instead of taps, bit i being the coefficient of x^i
+    - degree: the length of the register, by default the bit length of the taps or the polynomial degree
+    - word_bits: the number of bits produced per step, 8, 16, 32 or 64
+
+    Raises:
+    - ValueError: Raises the exception if the taps, the polynomial, the state or the word size are invalid
+    """
+    def __init__(self, state, taps=None, polynomial=None, degree=None, word_bits=64):
+        if (taps is None) == (polynomial is None):
+            raise ValueError("Give either the taps or the feedback polynomial of the LFSR.")
+        if polynomial is not None:
+            if polynomial < 2:
+                raise ValueError("The feedback polynomial must have a degree of at least 1.")
+            degree = polynomial.bit_length() - 1
+            taps = polynomial ^ (1 << degree)
+        elif degree is None:
+            degree = taps.bit_length()
+        if degree < 1 or taps < 0 or taps >> degree:
+            raise ValueError("The taps must lie within the register.")
+        if isinstance(state, (bytes, bytearray)):
+            state = int.from_bytes(state, 'little')
+        if state < 0 or state >> degree:
+            raise ValueError(f"The LFSR state must fit in {degree} bits.")
+        if word_bits not in word_typecodes:
+            raise ValueError("The word size must be 8, 16, 32 or 64 bits.")
+
+        self.taps = taps
+        self.degree = degree
+        self.state = state
+        self.word_bits = word_bits
+        self.tables = self.build_step_tables()
+        self.pending = b'' # Bytes generated but not handed out yet
+
+        # The one-cycle step as a companion matrix, followed by its squares as jumps are needed
+        top = degree - 1
+        step_columns = [((taps >> bit) & 1) << top | (1 << bit >> 1) for bit in range(degree)]
+        self.square_powers = [step_columns]
+
+    def step_bits(self, state, count):
+        """
+        Clocks a state one bit at a time.
+
+        Parameters:
+        - state: the state to start from
+        - count: the number of cycles
+
+        Returns:
+        - The output bits as an integer (the first one in bit 0) and the new state
+        """
+        output = 0
+        top = self.degree - 1
+        for i in range(count):
+            output |= (state & 1) << i
+            feedback = bin(state & self.taps).count('1') & 1
+            state = (state >> 1) | (feedback << top)
+        return output, state
+
+    def build_step_tables(self):
+        """
+        Builds the byte-step tables. A step is linear in the state, so the new state and output word
+        are the XOR of one table entry per state byte, each entry holding the new state above the
+        output word.
+
+        Returns:
+        - A list of (shift, table) pairs, one per byte of the state
+        """
+        # The step of every single state bit, which all the table entries are combined from
+        basis = []
+        for bit in range(self.degree):
+            output, state = self.step_bits(1 << bit, self.word_bits)
+            basis.append((state << self.word_bits) | output)
+
+        tables = []
+        for shift in range(0, self.degree, 8):
+            bits = basis[shift:shift + 8]
+            table = [0] * (1 << len(bits))
+            for value in range(1, len(table)):
+                lowest = value & -value
+                table[value] = table[value ^ lowest] ^ bits[lowest.bit_length() - 1]
+            tables.append((shift, table))
+        return tables
+
+    def read(self, size):
+        """
+        Takes the next keystream bytes, the first output bit being the least significant bit of the first byte.
+
+        Parameters:
+        - size: the number of bytes
+
+        Returns:
+        - The keystream bytes
+        """
+        word_bytes = self.word_bits // 8
+        count = -(-(size - len(self.pending)) // word_bytes)
+        if count > 0:
+            word_bits = self.word_bits
+            word_mask = (1 << word_bits) - 1
+            tables = self.tables
+            state = self.state
+            words = array(word_typecodes[word_bits])
+            append = words.append
+            for _ in range(count):
+                combined = 0
+                for shift, table in tables:
+                    combined ^= table[(state >> shift) & 0xff]
+                append(combined & word_mask)
+                state = combined >> word_bits
+            self.state = state
+            if sys.byteorder == 'big':
+                words.byteswap()
+            self.pending += words.tobytes()
+
+        keystream, self.pending = self.pending[:size], self.pending[size:]
+        return keystream
+
+    def jump_state(self, state, cycles):
+        """
+        Advances a state by any number of cycles with the powers of the companion matrix, in
+        O(n^2 log cycles) integer operations for a register of n bits.
+
+        Parameters:
+        - state: the state to start from
+        - cycles: the number of cycles to advance
+
+        Raises:
+        - ValueError: Raises the exception if the number of cycles is negative
+
+        Returns:
+        - The state after the given number of cycles
+        """
+        if cycles < 0:
+            raise ValueError("The LFSR can only jump forwards.")
+        powers = self.square_powers
+        while len(powers) < cycles.bit_length():
+            powers.append(gf2_matrix_multiply(powers[-1], powers[-1]))
+        for power in range(cycles.bit_length()):
+            if (cycles >> power) & 1:
+                state = gf2_matrix_apply(powers[power], state)
+        return state
+
+    def skip(self, size):
+        """
+        Advances the keystream by a number of bytes without generating them.
+
+        Parameters:
+        - size: the number of bytes to skip
+        """
+        if size <= len(self.pending):
+            self.pending = self.pending[size:]
+        else:
+            self.state = self.jump_state(self.state, 8 * (size - len(self.pending)))
+            self.pending = b''
+
+    def bits(self, count):
+        """
+        Takes the next keystream bits as a '0'/'1' string, a whole number of bytes being consumed.
+
+        Parameters:
+        - count: the number of bits
+
+        Returns:
+        - The keystream bits in output order
+        """
+        return ''.join(byte_bits[value] for value in self.read(-(-count // 8)))[:count]
+
+def keystream_segment(state, taps, degree, word_bits, size):
+    """
+    Generates one segment of an LFSR keystream, in a worker process.
+
+    Parameters:
+    - state: the state at the start of the segment
+    - taps: the tap mask of the LFSR
+    - degree: the length of the register
+    - word_bits: the number of bits produced per step
+    - size: the number of bytes
+
+    Returns:
+    - The keystream bytes of the segment
+    """
+    return LFSR(state, taps=taps, degree=degree, word_bits=word_bits).read(size)
+
+def parallel_keystream(register, size, workers=None, segment_size=lfsr_segment_size):
+    """
+    Takes the next keystream bytes of an LFSR, generating disjoint segments in a process pool. The
+    start state of each segment is found by jumping ahead, and the register ends up where a plain
+    read would leave it.
+
+    Parameters:
+    - register: the LFSR to read from
+    - size: the number of bytes
+    - workers: the number of worker processes, defaults to the number of CPUs, 1 runs in this process
+    - segment_size: the number of bytes generated by each task
+
+    Returns:
+    - The keystream bytes
+    """
+    workers = workers or os.cpu_count() or 1
+    head = register.read(min(size, len(register.pending)))
+    remaining = size - len(head)
+    if workers == 1 or remaining < 2 * segment_size:
+        return head + register.read(remaining)
+
+    # Every segment starts one segment jump after the previous one
+    segment_jump = register.jump_state
+    lengths = [min(segment_size, remaining - offset) for offset in range(0, remaining, segment_size)]
+    states = [register.state]
+    for _ in lengths[1:]:
+        states.append(segment_jump(states[-1], 8 * segment_size))
+    register.state = register.jump_state(states[-1], 8 * lengths[-1])
+
+    count = len(lengths)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        segments = executor.map(keystream_segment, states, [register.taps] * count, [register.degree] * count,
+                                [register.word_bits] * count, lengths)
+        return head + b''.join(segments)
+
+def sequence_bytes(sequence):
+    """
+    Packs a bit sequence into bytes, the first bit being the least significant bit of the first byte.
+
+    Parameters:
+    - sequence: a '0'/'1' string, such as the output of lfsr(), or bytes packed the same way as LFSR.read
+
+    Raises:
+    - ValueError: Raises the exception if a string holds other characters than '0' and '1'
+
+    Returns:
+    - The packed bytes and the number of bits
+    """
+    if isinstance(sequence, str):
+        if sequence.strip('01'):
+            raise ValueError("The bit sequence must only contain '0' and '1'.")
+        if not sequence:
+            return b'', 0
+        return int(sequence[::-1], 2).to_bytes(-(-len(sequence) // 8), 'little'), len(sequence)
+    sequence = bytes(sequence)
+    return sequence, 8 * len(sequence)
+
+def berlekamp_massey(sequence, length=None):
+    """
+    Finds the shortest LFSR generating a bit sequence with the Berlekamp-Massey algorithm over GF(2).
+    The connection polynomials are integers, so each update is a shift and an XOR, and the
+    discrepancy is the parity of the polynomial ANDed with a window of the latest bits.
+
+    Parameters:
+    - sequence: a '0'/'1' string, such as the output of lfsr(), or bytes packed the same way as LFSR.read
+    - length: the number of bits to analyse, by default all of them
+
+    Returns:
+    - The linear complexity, the connection polynomial (bit i being the coefficient of x^i) and the
+      linear complexity profile (the complexity after each bit)
+    """
+    data, bit_count = sequence_bytes(sequence)
+    if length is not None:
+        bit_count = min(bit_count, length)
+
+    connection = 1 # Current connection polynomial C(x)
+    previous = 1 # Connection polynomial before the last length change B(x)
+    complexity = 0
+    shift = 1 # Number of bits since the last length change
+    profile = array('I')
+    record = profile.append
+
+    # The window holds the latest bits, bit i being the bit i places back, and widens as the complexity grows
+    window = 0
+    width = 64
+    window_mask = (1 << width) - 1
+    position = 0
+    for value in data:
+        for _ in range(8):
+            if position == bit_count:
+                return complexity, connection, profile
+            window = ((window << 1) | (value & 1)) & window_mask
+            value >>= 1
+
+            if (connection & window).bit_count() & 1:
+                if 2 * complexity <= position:
+                    connection, previous = connection ^ (previous << shift), connection
+                    complexity = position + 1 - complexity
+                    shift = 1
+                    if complexity >= width:
+                        # Refill the wider window from the sequence, as the dropped bits are needed again
+                        width = 2 * complexity
+                        window_mask = (1 << width) - 1
+                        start = max(position + 1 - width, 0)
+                        bits = (int.from_bytes(data, 'little') >> start) & ((1 << (position + 1 - start)) - 1)
+                        window = int(format(bits, f'0{position + 1 - start}b')[::-1], 2)
+                else:
+                    connection ^= previous << shift
+                    shift += 1
+            else:
+                shift += 1
+            record(complexity)
+            position += 1
+    return complexity, connection, profile
+
+def connection_to_lfsr(sequence, complexity, connection):
+    """
+    Builds the LFSR found by berlekamp_massey, loaded with the start of the sequence, so that it
+    generates the whole sequence again.
+
+    Parameters:
+    - sequence: the analysed sequence, as given to berlekamp_massey
+    - complexity: the linear complexity
+    - connection: the connection polynomial
+
+    Returns:
+    - The LFSR, or None for the all-zero sequence
+    """
+    if complexity == 0:
+        return None
+    data, _ = sequence_bytes(sequence)
+    state = int.from_bytes(data, 'little') & ((1 << complexity) - 1)
+    # Coefficient i of C(x) taps the bit i places back, which is bit (complexity - i) of the state
+    taps = 0
+    for i in range(1, complexity + 1):
+        if (connection >> i) & 1:
+            taps |= 1 << (complexity - i)
+    return LFSR(state, taps=taps, degree=complexity)
 
 def main():
     # Example values
@@ -38,6 +413,18 @@ def main():
 
     generated_key2 = lfsr(initial_state2, polynomial_degree2, cycles2)
     print(f"Generated key after {cycles2} cycles:", generated_key2)
+
+    # Keystream bytes from the feedback polynomial x^16 + x^14 + x^13 + x^11 + 1
+    register = LFSR(0xACE1, polynomial=0b10110100000000001)
+    print("Keystream bytes:", register.read(8).hex())
+
+    # Jump a million bytes ahead instead of generating them
+    register.skip(1000000)
+    print("Keystream bytes after skipping 1 MB:", register.read(8).hex())
+
+    # Recover the shortest LFSR behind a generated key
+    complexity, connection, _ = berlekamp_massey(lfsr(initial_state, polynomial_degree, 100))
+    print(f"Linear complexity: {complexity}, connection polynomial: {connection:b}")
     
 if __name__ == "__main__":
     main()
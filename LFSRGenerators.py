@@ -0,0 +1,283 @@
+import functools
+import sys
+import time
+from array import array
+from LFSR import LFSR
+
+# Default feedback polynomials (primitive, bit i being the coefficient of x^i) of each generator
+geffe_polynomials = ((1 << 31) | (1 << 3) | 1, (1 << 29) | (1 << 2) | 1, (1 << 23) | (1 << 5) | 1)
+shrinking_polynomials = ((1 << 31) | (1 << 3) | 1, (1 << 29) | (1 << 2) | 1)
+majority_polynomials = ((1 << 19) | (1 << 18) | (1 << 17) | (1 << 14) | 1, (1 << 22) | (1 << 21) | 1,
+                        (1 << 23) | (1 << 22) | (1 << 21) | (1 << 8) | 1)
+
+# Clocking bits of the majority generator registers, as in A5/1 but counted from the output end
+majority_clock_bits = (10, 11, 12)
+
+def registers_from_key(key, polynomials):
+    """
+    Loads one LFSR per feedback polynomial from the bits of a key, the first register taking the lowest bits.
+
+    Parameters:
+    - key: the key bytes, read as a little-endian integer
+    - polynomials: the feedback polynomials of the registers
+
+    Raises:
+    - ValueError: Raises the exception if the key is too short or would load a register with zeros
+
+    Returns:
+    - The list of LFSRs
+    """
+    degrees = [polynomial.bit_length() - 1 for polynomial in polynomials]
+    if 8 * len(key) < sum(degrees):
+        raise ValueError(f"The key must be at least {-(-sum(degrees) // 8)} bytes long for these registers.")
+
+    value = int.from_bytes(key, 'little')
+    registers = []
+    for polynomial, degree in zip(polynomials, degrees):
+        state = value & ((1 << degree) - 1)
+        if not state:
+            raise ValueError("The key would load a register with zeros, which only outputs zeros.")
+        registers.append(LFSR(state, polynomial=polynomial))
+        value >>= degree
+    return registers
+
+class GeffeGenerator:
+    """
+    Geffe generator: the first register selects, bit by bit, the output of the second register
+    (where it is 1) or of the third (where it is 0). The three keystreams are combined a whole
+    read at a time as integers.
+
+    Parameters:
+    - selector: the LFSR choosing between the other two
+    - first: the LFSR used where the selector outputs 1
+    - second: the LFSR used where the selector outputs 0
+    """
+    def __init__(self, selector, first, second):
+        self.selector = selector
+        self.first = first
+        self.second = second
+
+    def read(self, size):
+        """
+        Takes the next keystream bytes.
+
+        Parameters:
+        - size: the number of bytes
+
+        Returns:
+        - The keystream bytes
+        """
+        selector = int.from_bytes(self.selector.read(size), 'little')
+        first = int.from_bytes(self.first.read(size), 'little')
+        second = int.from_bytes(self.second.read(size), 'little')
+        return (second ^ (selector & (first ^ second))).to_bytes(size, 'little')
+
+@functools.lru_cache(maxsize=None)
+def shrinking_table():
+    """
+    Builds the table compacting one selector byte and one source byte, indexed by selector * 256 + source.
+
+    Returns:
+    - A list of entries holding the kept source bits in the low byte and their number above it
+    """
+    table = []
+    for selector in range(256):
+        for source in range(256):
+            kept = count = 0
+            for bit in range(8):
+                if (selector >> bit) & 1:
+                    kept |= ((source >> bit) & 1) << count
+                    count += 1
+            table.append(kept | (count << 8))
+    return table
+
+class ShrinkingGenerator:
+    """
+    Shrinking generator: the bits of the source register are kept where the selector register
+    outputs 1 and dropped otherwise. Both registers are read a byte at a time and compacted
+    through a byte-pair table.
+
+    Parameters:
+    - selector: the LFSR deciding which bits are kept
+    - source: the LFSR whose bits are output
+    """
+    def __init__(self, selector, source):
+        self.selector = selector
+        self.source = source
+        self.pending = b'' # Bytes generated but not handed out yet
+        self.accumulator = 0 # Kept bits not making up a whole byte yet
+        self.filled = 0 # Number of bits in the accumulator
+
+    def read(self, size):
+        """
+        Takes the next keystream bytes.
+
+        Parameters:
+        - size: the number of bytes
+
+        Returns:
+        - The keystream bytes
+        """
+        table = shrinking_table()
+        accumulator, filled = self.accumulator, self.filled
+        while len(self.pending) < size:
+            # Half of the selector bits are 1 on average, so twice the missing bytes are read
+            count = max(2 * (size - len(self.pending)), 64)
+            words = array('Q')
+            append = words.append
+            for selector, source in zip(self.selector.read(count), self.source.read(count)):
+                entry = table[(selector << 8) | source]
+                accumulator |= (entry & 0xff) << filled
+                filled += entry >> 8
+                if filled >= 64:
+                    append(accumulator & 0xffffffffffffffff)
+                    accumulator >>= 64
+                    filled -= 64
+            if sys.byteorder == 'big':
+                words.byteswap()
+            whole = filled // 8
+            self.pending += words.tobytes() + (accumulator & ((1 << (8 * whole)) - 1)).to_bytes(whole, 'little')
+            accumulator >>= 8 * whole
+            filled -= 8 * whole
+        self.accumulator, self.filled = accumulator, filled
+
+        keystream, self.pending = self.pending[:size], self.pending[size:]
+        return keystream
+
+class MajorityClockGenerator:
+    """
+    A5/1-style generator of three registers with irregular clocking: each cycle the registers whose
+    clocking bit agrees with the majority of the three clocking bits are clocked, and the output bit
+    is the XOR of the three output bits. The clocking depends on every bit, so it runs a bit at a time
+    on the integer states.
+
+    Parameters:
+    - registers: the three LFSRs, which must not have buffered keystream
+    - clock_bits: the clocking bit position in the state of each register
+
+    Raises:
+    - ValueError: Raises the exception if there are not three registers or a register has buffered keystream
+    """
+    def __init__(self, registers, clock_bits=majority_clock_bits):
+        if len(registers) != 3 or len(clock_bits) != 3:
+            raise ValueError("The majority generator needs three registers and three clocking bits.")
+        if any(register.pending for register in registers):
+            raise ValueError("The registers must not have buffered keystream.")
+        self.registers = registers
+        self.clock_bits = clock_bits
+
+    def read(self, size):
+        """
+        Takes the next keystream bytes, the first output bit being the least significant bit of the first byte.
+
+        Parameters:
+        - size: the number of bytes
+
+        Returns:
+        - The keystream bytes
+        """
+        first, second, third = self.registers
+        state1, state2, state3 = first.state, second.state, third.state
+        taps1, taps2, taps3 = first.taps, second.taps, third.taps
+        top1, top2, top3 = first.degree - 1, second.degree - 1, third.degree - 1
+        clock1, clock2, clock3 = self.clock_bits
+
+        keystream = bytearray(size)
+        for index in range(size):
+            value = 0
+            for bit in range(8):
+                bit1 = (state1 >> clock1) & 1
+                bit2 = (state2 >> clock2) & 1
+                bit3 = (state3 >> clock3) & 1
+                majority = (bit1 & bit2) | (bit1 & bit3) | (bit2 & bit3)
+                if bit1 == majority:
+                    state1 = (state1 >> 1) | (((state1 & taps1).bit_count() & 1) << top1)
+                if bit2 == majority:
+                    state2 = (state2 >> 1) | (((state2 & taps2).bit_count() & 1) << top2)
+                if bit3 == majority:
+                    state3 = (state3 >> 1) | (((state3 & taps3).bit_count() & 1) << top3)
+                value |= ((state1 ^ state2 ^ state3) & 1) << bit
+            keystream[index] = value
+
+        first.state, second.state, third.state = state1, state2, state3
+        return bytes(keystream)
+
+def geffe_generator(key, polynomials=geffe_polynomials):
+    """
+    Creates a Geffe generator with its registers loaded from a key.
+
+    Parameters:
+    - key: the key bytes, 11 bytes for the default registers
+    - polynomials: the feedback polynomials of the selector and the two combined registers
+
+    Returns:
+    - The GeffeGenerator
+    """
+    return GeffeGenerator(*registers_from_key(key, polynomials))
+
+def shrinking_generator(key, polynomials=shrinking_polynomials):
+    """
+    Creates a shrinking generator with its registers loaded from a key.
+
+    Parameters:
+    - key: the key bytes, 8 bytes for the default registers
+    - polynomials: the feedback polynomials of the selector and the source registers
+
+    Returns:
+    - The ShrinkingGenerator
+    """
+    return ShrinkingGenerator(*registers_from_key(key, polynomials))
+
+def majority_generator(key, polynomials=majority_polynomials, clock_bits=majority_clock_bits):
+    """
+    Creates an A5/1-style majority clocked generator with its registers loaded from a key.
+
+    Parameters:
+    - key: the key bytes, 8 bytes for the default registers
+    - polynomials: the feedback polynomials of the three registers
+    - clock_bits: the clocking bit position of each register
+
+    Returns:
+    - The MajorityClockGenerator
+    """
+    return MajorityClockGenerator(registers_from_key(key, polynomials), clock_bits)
+
+def benchmark_generators(size=1 << 20, majority_size=1 << 15):
+    """
+    Measures the keystream throughput of each generator.
+
+    Parameters:
+    - size: the number of bytes read from the Geffe and shrinking generators
+    - majority_size: the number of bytes read from the slower majority generator
+
+    Returns:
+    - A dictionary of MB/s by generator name
+    """
+    key = bytes(range(1, 12))
+    generators = (
+        ("geffe", geffe_generator(key), size),
+        ("shrinking", shrinking_generator(key), size),
+        ("majority", majority_generator(key), majority_size),
+    )
+    shrinking_table() # Built once, outside the measurement
+    results = {}
+    for name, generator, length in generators:
+        start = time.perf_counter()
+        generator.read(length)
+        results[name] = length / (time.perf_counter() - start) / 1e6
+    return results
+
+def main():
+    key = bytes.fromhex("0123456789abcdeffedcba")
+
+    # Example keystreams of each generator
+    print("Geffe keystream:", geffe_generator(key).read(16).hex())
+    print("Shrinking keystream:", shrinking_generator(key).read(16).hex())
+    print("Majority clocked keystream:", majority_generator(key[:8]).read(16).hex())
+
+    # Throughput of each generator
+    for name, rate in benchmark_generators().items():
+        print(f"{name}: {rate:.2f} MB/s")
+
+if __name__ == "__main__":
+    main()
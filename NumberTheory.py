@@ -0,0 +1,165 @@
+import math
+
+def gcd(a, b):
+    """
+    Computes the greatest common divisor (GCD) of the two numbers using the Euclidean algorithm.
+
+    Parameters:
+    - a: first number
+    - b: second number
+
+    Returns:
+    - GCD of a and b, which is never negative
+    """
+    return math.gcd(a, b)
+
+def extended_gcd(a, b):
+    """
+    Computes the greatest common divisor of two integers and the coefficients of Bézout's identity,
+    which are integers x and y such that ax + by = gcd(a, b)
+
+    Parameters:
+    - a: first number.
+    - b: second number.
+
+    Returns:
+    - The GCD of two integers and the Bézout's identity
+    """
+    old_r, r = a, b
+    old_s, s = 1, 0
+    old_t, t = 0, 1
+
+    while r != 0:
+        quotient = old_r // r
+        old_r, r = r, old_r - quotient * r
+        old_s, s = s, old_s - quotient * s
+        old_t, t = t, old_t - quotient * t
+
+    return old_r, old_s, old_t
+
+def mod_inverse(a, m):
+    """
+    Computes the modular inverse of a number a mod m with the built-in pow, which runs the
+    Extended Euclidean algorithm in C.
+
+    Parameters:
+    - a: the number for which the inverse is going to be found
+    - m: the modulus
+
+    Raises:
+    - ValueError: Raises the exception if a has no inverse mod m
+
+    Returns:
+    - The modular inverse of a mod m
+    """
+    try:
+        return pow(a, -1, m)
+    except ValueError:
+        raise ValueError(f"{a} has no modular inverse modulo {m}") from None
+
+def batch_mod_inverse(values, m):
+    """
+    Computes the modular inverses of many numbers with Montgomery's trick: a single inversion of
+    the product of all the numbers, followed by three multiplications per number.
+
+    Parameters:
+    - values: the numbers for which the inverses are going to be found
+    - m: the modulus
+
+    Raises:
+    - ValueError: Raises the exception if the modulus is not positive or one of the numbers has no inverse mod m
+
+    Returns:
+    - The list of the modular inverses, in the same order
+    """
+    if m < 1:
+        raise ValueError(f"The modulus must be positive, not {m}")
+    values = list(values)
+    # prefixes[i] is the product of the first i numbers
+    prefixes = [1]
+    for value in values:
+        prefixes.append(prefixes[-1] * value % m)
+
+    try:
+        inverse = pow(prefixes[-1], -1, m)
+    except ValueError:
+        # Report the first number that cannot be inverted, or the product when each one can
+        for value in values:
+            mod_inverse(value, m)
+        raise ValueError(f"The product {prefixes[-1]} of the numbers has no modular inverse modulo {m}") from None
+
+    inverses = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        inverses[i] = inverse * prefixes[i] % m
+        inverse = inverse * values[i] % m
+    return inverses
+
+def crt(remainders, moduli):
+    """
+    Solves a system of congruences x = remainders[i] mod moduli[i] with the Chinese Remainder Theorem.
+
+    Parameters:
+    - remainders: the remainders
+    - moduli: the pairwise coprime moduli
+
+    Raises:
+    - ValueError: Raises the exception if the lists differ in length or the moduli are not pairwise coprime
+
+    Returns:
+    - The solution x, with 0 <= x < the product of the moduli, and the product of the moduli
+    """
+    if len(remainders) != len(moduli):
+        raise ValueError("There must be one modulus per remainder.")
+
+    x, product = 0, 1
+    for remainder, modulus in zip(remainders, moduli):
+        if gcd(product, modulus) != 1:
+            raise ValueError("The moduli must be pairwise coprime.")
+        # Lift x to also satisfy x = remainder mod modulus
+        x += product * ((remainder - x) * pow(product, -1, modulus) % modulus)
+        product *= modulus
+    return x % product, product
+
+def jacobi(a, n):
+    """
+    Computes the Jacobi symbol (a/n) with the law of quadratic reciprocity.
+
+    Parameters:
+    - a: the numerator
+    - n: the denominator, a positive odd number
+
+    Raises:
+    - ValueError: Raises the exception if n is not a positive odd number
+
+    Returns:
+    - The Jacobi symbol, 1, -1, or 0 when a and n are not coprime
+    """
+    if n <= 0 or n % 2 == 0:
+        raise ValueError("The Jacobi symbol needs a positive odd denominator.")
+
+    a %= n
+    result = 1
+    while a != 0:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result # (2/n) = -1 when n = 3 or 5 mod 8
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result # Quadratic reciprocity
+        a %= n
+    return result if n == 1 else 0
+
+def main():
+    # Example values
+    a = 240
+    b = 46
+    print(f"gcd({a}, {b}) = {gcd(a, b)}")
+    print(f"extended_gcd({a}, {b}) = {extended_gcd(a, b)}")
+    print(f"mod_inverse(17, 3120) = {mod_inverse(17, 3120)}")
+    print(f"batch_mod_inverse([2, 3, 4], 7) = {batch_mod_inverse([2, 3, 4], 7)}")
+    print(f"crt([2, 3, 2], [3, 5, 7]) = {crt([2, 3, 2], [3, 5, 7])}")
+    print(f"jacobi(1001, 9907) = {jacobi(1001, 9907)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,8 @@
 import random
-from affine_cipher import gcd
+from NumberTheory import gcd, mod_inverse
 from SquareAndMultipy import square_and_multiply
 from PrimalityTests import miller_rabin_primality_test
 
-def extended_gcd(a, b):
-    """
-    Computes the greatest common divisor of two integers and the coefficients of Bézout's identity, 
-    which are integers x and y such that ax + by = gcd(a, b)
-
-    Parameters:
-    - a: first number.
-    - b: second number.
-
-    Returns:
-    - The GCD of two integers and the Bézout's identity
-    """
-    old_r, r = a, b
-    old_s, s = 1, 0
-    old_t, t = 0, 1
-
-    while r != 0:
-        quotient = old_r // r
-        old_r, r = r, old_r - quotient * r
-        old_s, s = s, old_s - quotient * s
-        old_t, t = t, old_t - quotient * t
-
-    return old_r, old_s, old_t
-
-def mod_inverse(a, m):
-    """
-    Computes the modular inverse of a number a mod m using the Extended Euclidean algorithm. 
-
-    Parameters:
-    - a: the number for which the inverse is going to be found
-    - m: the modulus
-
-    Returns:
-    - The modular inverse of a mod m if it exists, otherwise it returns an error
-    """
-    gcd, x, _ = extended_gcd(a, m)
-    if gcd != 1:
-        raise ValueError(f"{a} has no modular inverse modulo {m}")
-    else:
-        return x % m
-
 def generate_key_pair(key_size):
     """
     Generates an RSA key pair with the specified key size.
@@ -1,33 +1,140 @@
-def gcd(a, b):
+import functools
+import string
+from NumberTheory import gcd, mod_inverse
+
+# Number of bytes read at a time when encrypting files
+affine_chunk_size = 1 << 20
+
+# Relative frequencies of the letters A-Z in English text
+english_frequencies = (
+    0.08167, 0.01492, 0.02782, 0.04253, 0.12702, 0.02228, 0.02015, 0.06094, 0.06966, 0.00153,
+    0.00772, 0.04025, 0.02406, 0.06749, 0.07507, 0.01929, 0.00095, 0.05987, 0.06327, 0.09056,
+    0.02758, 0.00978, 0.02360, 0.00150, 0.01974, 0.00074,
+)
+
+class AffineCipher:
     """
-    Computes the greatest common divisor (GCD) of the two numbers using the Euclidean algorithm. 
+    Affine Cipher for a fixed key. The translation tables for text and for bytes are built once,
+    so encrypting and decrypting is a single str.translate or bytes.translate call. Only the
+    letters A-Z and a-z are encrypted, keeping their case.
 
     Parameters:
-    - a: first number
-    - b: second number
+    - a: the multiplier in the encryption formula, coprime with 26
+    - b: the constant term in the encryption formula
 
-    Returns:
-    - GCD of a and b
+    Raises:
+    - ValueError: Raises the exception if a has no inverse mod 26
     """
-    while b != 0:
-        a, b = b, a % b # Update a and b using the Euclidean algorithm 
-    return a
+    def __init__(self, a, b):
+        m = 26 # Size of the English alphabet
+        try:
+            a_inv = mod_inverse(a, m)
+        except ValueError:
+            raise ValueError(f"The multiplier {a} has no inverse mod {m}, so the text could not be decrypted.") from None
+        self.a = a
+        self.b = b
+
+        letters = string.ascii_uppercase + string.ascii_lowercase
+        encrypted = ''.join(alphabet[(a * i + b) % m] for alphabet in (string.ascii_uppercase, string.ascii_lowercase) for i in range(m))
+        decrypted = ''.join(alphabet[(a_inv * (i - b)) % m] for alphabet in (string.ascii_uppercase, string.ascii_lowercase) for i in range(m))
+        self.encrypt_table = str.maketrans(letters, encrypted)
+        self.decrypt_table = str.maketrans(letters, decrypted)
+        self.encrypt_bytes_table = bytes.maketrans(letters.encode(), encrypted.encode())
+        self.decrypt_bytes_table = bytes.maketrans(letters.encode(), decrypted.encode())
+
+    def encrypt(self, plaintext):
+        """
+        Encrypts a text, or ASCII-compatible bytes such as UTF-8.
+
+        Parameters:
+        - plaintext: the message as a str, bytes or bytearray
+
+        Returns:
+        - The encrypted message, of the same type
+        """
+        if isinstance(plaintext, str):
+            return plaintext.translate(self.encrypt_table)
+        return plaintext.translate(self.encrypt_bytes_table)
+
+    def decrypt(self, ciphertext):
+        """
+        Decrypts a text, or ASCII-compatible bytes such as UTF-8.
+
+        Parameters:
+        - ciphertext: the encrypted message as a str, bytes or bytearray
 
-def mod_inverse(a, m):
+        Returns:
+        - The decrypted message, of the same type
+        """
+        if isinstance(ciphertext, str):
+            return ciphertext.translate(self.decrypt_table)
+        return ciphertext.translate(self.decrypt_bytes_table)
+
+    def process_file(self, source, destination, decrypt=False, chunk_size=affine_chunk_size):
+        """
+        Encrypts or decrypts a file chunk by chunk, as bytes, so files of any size use constant
+        memory. The letters of any ASCII-compatible encoding (such as UTF-8) are handled.
+
+        Parameters:
+        - source: the path of the file to read
+        - destination: the path of the file to write
+        - decrypt: True to decrypt instead of encrypt
+        - chunk_size: the number of bytes read at a time
+
+        Returns:
+        - The number of bytes processed
+        """
+        table = self.decrypt_bytes_table if decrypt else self.encrypt_bytes_table
+        processed = 0
+        with open(source, 'rb') as reader, open(destination, 'wb') as writer:
+            while True:
+                chunk = reader.read(chunk_size)
+                if not chunk:
+                    return processed
+                writer.write(chunk.translate(table))
+                processed += len(chunk)
+
+    def encrypt_file(self, source, destination, chunk_size=affine_chunk_size):
+        """
+        Encrypts a file chunk by chunk.
+
+        Parameters:
+        - source: the path of the file to read
+        - destination: the path of the file to write
+        - chunk_size: the number of bytes read at a time
+
+        Returns:
+        - The number of bytes processed
+        """
+        return self.process_file(source, destination, False, chunk_size)
+
+    def decrypt_file(self, source, destination, chunk_size=affine_chunk_size):
+        """
+        Decrypts a file chunk by chunk.
+
+        Parameters:
+        - source: the path of the file to read
+        - destination: the path of the file to write
+        - chunk_size: the number of bytes read at a time
+
+        Returns:
+        - The number of bytes processed
+        """
+        return self.process_file(source, destination, True, chunk_size)
+
+@functools.lru_cache(maxsize=512)
+def get_affine_cipher(a, b):
     """
-    Computes the modular inverse of a number a mod m using the Extended Euclidean algorithm. 
+    Gives the AffineCipher of a key, building its tables only the first time the key is used.
 
     Parameters:
-    - a: the number for which the inverse is going to be found
-    - m: the modulus
+    - a: the multiplier in the encryption formula
+    - b: the constant term in the encryption formula
 
     Returns:
-    - The modular inverse of a mod m if it exists, otherwise it returns None
+    - The AffineCipher
     """
-    for i in range(1, m):
-        if (a * i) % m == 1:
-            return i # Return the modular inverse if found
-    return None
+    return AffineCipher(a, b)
 
 def encrypt(plaintext, a, b):
     """
@@ -38,22 +145,13 @@ def encrypt(plaintext, a, b):
     - a: the multiplier in the encryption formula
     - b: the constant term in the encryption formula
 
+    Raises:
+    - ValueError: Raises the exception if a has no inverse mod 26
+
     Returns:
     - The encrypted message
     """
-    result = "" # Initialize an empty string
-    m = 26 # Size of the English alphabet 
-    
-    for char in plaintext:
-        if char.isalpha():
-            if char.isupper():
-                result += chr((a * (ord(char) - ord('A')) + b) % m + ord('A')) # Encrypts capital letters
-            else:
-                result += chr((a * (ord(char) - ord('a')) + b) % m + ord('a')) # Encrypts lower-case letters
-        else:
-            result += char # Non-alphabetic characters are not encrypted
-            
-    return result
+    return get_affine_cipher(a, b).encrypt(plaintext)
 
 def decrypt(ciphertext, a, b):
     """
@@ -64,24 +162,59 @@ def decrypt(ciphertext, a, b):
     - a: the multiplier in the decryption formula
     - b: the constant term in the decryption formula
 
+    Raises:
+    - ValueError: Raises the exception if a has no inverse mod 26
+
     Returns:
     - The decrypted plaintext message
     """
-    # Initialize an empty string
-    result = ""
-    m = 26 # Size of the English alphabet 
-    a_inv = mod_inverse(a, m)
-    
-    for char in ciphertext:
-        if char.isalpha():
-            if char.isupper():
-                result += chr((a_inv * (ord(char) - ord('A') - b)) % m + ord('A')) # Decrypts capital letters
-            else:
-                result += chr((a_inv * (ord(char) - ord('a') - b)) % m + ord('a')) # Decrypts lower-case letters
-        else:
-            result += char # Non-alphabetic characters are not decrypted
-            
-    return result
+    return get_affine_cipher(a, b).decrypt(ciphertext)
+
+def letter_histogram(text):
+    """
+    Counts the letters of a text, ignoring case.
+
+    Parameters:
+    - text: the text as a str, bytes or bytearray
+
+    Returns:
+    - A list of the 26 counts of A to Z
+    """
+    if isinstance(text, str):
+        return [text.count(upper) + text.count(lower) for upper, lower in zip(string.ascii_uppercase, string.ascii_lowercase)]
+    return [text.count(upper) + text.count(lower) for upper, lower in zip(string.ascii_uppercase.encode(), string.ascii_lowercase.encode())]
+
+def rank_keys(ciphertext, frequencies=english_frequencies):
+    """
+    Ranks all 312 affine keys by how English the decrypted text would look, with the chi-squared
+    statistic of its letter counts. The ciphertext histogram is counted once and each key only
+    permutes it, since plaintext letter p becomes ciphertext letter (a * p + b) mod 26, so the
+    text is never decrypted.
+
+    Parameters:
+    - ciphertext: the encrypted message as a str, bytes or bytearray
+    - frequencies: the expected relative frequencies of the plaintext letters A to Z
+
+    Returns:
+    - A list of (chi-squared, a, b) tuples, the most likely key first
+    """
+    m = 26 # Size of the English alphabet
+    histogram = letter_histogram(ciphertext)
+    total = sum(histogram)
+    expected = [max(total * frequency, 1e-9) for frequency in frequencies]
+
+    candidates = []
+    for a in range(1, m):
+        if gcd(a, m) != 1:
+            continue
+        for b in range(m):
+            score = 0.0
+            for p in range(m):
+                difference = histogram[(a * p + b) % m] - expected[p]
+                score += difference * difference / expected[p]
+            candidates.append((score, a, b))
+    candidates.sort()
+    return candidates
 
 def main():
     # Example values for a and b 
@@ -100,6 +233,11 @@ def main():
     # Decryption
     decrypted_text = decrypt(encrypted_text, a, b)
     print("Decrypted: ", decrypted_text)
+
+    # Cryptanalysis of the affine cipher excercise
+    exercise = "falszztysyjzyjkywjrztyjztyynaryjkyswarztyegyyj"
+    score, a, b = rank_keys(exercise)[0]
+    print(f"Most likely key a={a}, b={b}: ", decrypt(exercise, a, b))
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,476 @@
+import argparse
+import mmap
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import AES
+import DES
+
+# Size of the pieces the input is read and processed in.
+default_chunk_size = 1 << 20
+
+# Length of the IV (or nonce) stored in front of the output for each cipher and mode.
+iv_lengths = {
+    ("aes", "cbc"): 16,
+    ("aes", "ctr"): 16,
+    ("aes", "gcm"): 12,
+    ("des", "cbc"): 8,
+    ("des", "ctr"): 8,
+}
+
+# Length of the tag stored at the end of the output for authenticated modes.
+tag_length = 16
+
+def cipher_functions(cipher, key):
+    """
+    Gets the block size and the functions that encrypt and decrypt whole blocks for a cipher.
+
+    Parameters:
+    - cipher: "aes" or "des"
+    - key: the key as bytes, for "des" an 8-byte key is DES and a 16- or 24-byte key is Triple DES
+
+    Raises:
+    - ValueError: Raises the exception if the key has the wrong length for the cipher
+
+    Returns:
+    - The block size, the encryption function and the decryption function, both taking and returning bytes
+    """
+    if cipher == "aes":
+        aes_key = AES.get_aes_key(key)
+        return 16, lambda data: bytes(AES.encrypt_blocks(aes_key, data)), lambda data: bytes(AES.decrypt_blocks(aes_key, data))
+
+    encryption_keys, decryption_keys = DES.des_key_schedules(key)
+    return (8, lambda data: bytes(DES.des_ecb_process(bytearray(data), encryption_keys)),
+            lambda data: bytes(DES.des_ecb_process(bytearray(data), decryption_keys)))
+
+def xor_bytes(first, second):
+    """
+    XORs two byte strings of the same length.
+
+    Parameters:
+    - first: the first bytes-like object
+    - second: the second bytes-like object
+
+    Returns:
+    - The XOR of both as bytes
+    """
+    length = len(first)
+    return (int.from_bytes(first, "big") ^ int.from_bytes(second, "big")).to_bytes(length, "big")
+
+class BlockModeStream:
+    """
+    Streaming ECB or CBC encryption and decryption with PKCS#7 padding. Only whole blocks are
+    processed on each update, and when decrypting the last block is held back until finalize()
+    so the padding can be removed.
+
+    Parameters:
+    - block_size: the block size of the cipher in bytes
+    - encrypt: function that encrypts whole blocks
+    - decrypt: function that decrypts whole blocks
+    - mode: "ecb" or "cbc"
+    - iv: the IV for CBC mode
+    - decrypting: True to decrypt instead of encrypting
+    """
+    def __init__(self, block_size, encrypt, decrypt, mode, iv, decrypting):
+        self.block_size = block_size
+        self.encrypt = encrypt
+        self.decrypt = decrypt
+        self.mode = mode
+        self.previous = iv # Last ciphertext block, for CBC
+        self.decrypting = decrypting
+        self.pending = b""
+
+    def process(self, blocks):
+        """
+        Encrypts or decrypts whole blocks.
+
+        Parameters:
+        - blocks: bytes holding a whole number of blocks
+
+        Returns:
+        - The processed blocks as bytes
+        """
+        if not blocks:
+            return b""
+        if self.mode == "ecb":
+            return self.decrypt(blocks) if self.decrypting else self.encrypt(blocks)
+
+        size = self.block_size
+        if self.decrypting:
+            # Every block can be decrypted at once, each is then XORed with the ciphertext before it
+            chained = self.previous + blocks[:-size]
+            self.previous = blocks[-size:]
+            return xor_bytes(self.decrypt(blocks), chained)
+
+        # Encryption has to go block by block, since each block depends on the one before it
+        output = bytearray()
+        for offset in range(0, len(blocks), size):
+            self.previous = self.encrypt(xor_bytes(blocks[offset:offset + size], self.previous))
+            output += self.previous
+        return bytes(output)
+
+    def update(self, data):
+        """
+        Processes the next piece of the stream.
+
+        Parameters:
+        - data: any bytes-like object
+
+        Returns:
+        - The output for all the whole blocks available so far
+        """
+        data = self.pending + bytes(data)
+        keep = len(data) % self.block_size
+        if self.decrypting and not keep:
+            keep = min(self.block_size, len(data)) # Hold back the block that may contain padding
+        ready = len(data) - keep
+        self.pending = data[ready:]
+        return self.process(data[:ready])
+
+    def finalize(self):
+        """
+        Ends the stream, adding the padding when encrypting or checking and removing it when decrypting.
+
+        Raises:
+        - ValueError: Raises the exception if the ciphertext length or the padding is not valid
+
+        Returns:
+        - The remaining output
+        """
+        if not self.decrypting:
+            padding = self.block_size - len(self.pending)
+            return self.process(self.pending + bytes([padding]) * padding)
+
+        if len(self.pending) != self.block_size:
+            raise ValueError("Invalid ciphertext length. The ciphertext must be a whole number of blocks.")
+        last_block = self.process(self.pending)
+        padding = last_block[-1]
+        if not 1 <= padding <= self.block_size or last_block[-padding:] != bytes([padding]) * padding:
+            raise ValueError("Invalid padding. The key or the ciphertext is wrong.")
+        return last_block[:-padding]
+
+class CounterModeStream:
+    """
+    Streaming CTR mode for any block cipher: the counter block starts as the nonce and is
+    incremented as a big-endian integer for every block.
+
+    Parameters:
+    - block_size: the block size of the cipher in bytes
+    - encrypt: function that encrypts whole blocks
+    - nonce: the initial counter block
+    """
+    def __init__(self, block_size, encrypt, nonce):
+        self.block_size = block_size
+        self.encrypt = encrypt
+        self.counter = int.from_bytes(nonce, "big")
+        self.keystream = b"" # Keystream left over from the previous update
+
+    def update(self, data):
+        """
+        Encrypts or decrypts the next piece of the stream.
+
+        Parameters:
+        - data: any bytes-like object
+
+        Returns:
+        - The processed data as bytes
+        """
+        size = self.block_size
+        needed = len(data) - len(self.keystream)
+        if needed > 0:
+            block_count = (needed + size - 1) // size
+            limit = 1 << (8 * size)
+            counters = b"".join(((self.counter + i) % limit).to_bytes(size, "big") for i in range(block_count))
+            self.counter += block_count
+            self.keystream += self.encrypt(counters)
+        keystream, self.keystream = self.keystream[:len(data)], self.keystream[len(data):]
+        return xor_bytes(data, keystream)
+
+    def finalize(self):
+        """
+        Ends the stream.
+
+        Returns:
+        - The remaining output, which is always empty since CTR mode needs no padding
+        """
+        return b""
+
+class GCMStream:
+    """
+    Streaming AES-GCM for files: the tag is written after the ciphertext when encrypting, and when
+    decrypting the last bytes of the input are held back since they are the tag.
+
+    Parameters:
+    - key: the AES key
+    - iv: the IV
+    - decrypting: True to decrypt and verify instead of encrypting
+    - workers: the number of worker processes for large pieces
+    """
+    def __init__(self, key, iv, decrypting, workers):
+        self.gcm = AES.AESGCM(key, iv, decrypt=decrypting, workers=workers)
+        self.decrypting = decrypting
+        self.pending = b""
+
+    def update(self, data):
+        """
+        Encrypts or decrypts the next piece of the stream.
+
+        Parameters:
+        - data: any bytes-like object
+
+        Returns:
+        - The processed data as bytes
+        """
+        if not self.decrypting:
+            return self.gcm.update(data)
+        data = self.pending + bytes(data)
+        self.pending = data[-tag_length:]
+        return self.gcm.update(data[:-tag_length])
+
+    def finalize(self):
+        """
+        Ends the stream.
+
+        Raises:
+        - ValueError: Raises the exception if the tag does not match when decrypting
+
+        Returns:
+        - The tag when encrypting, nothing when decrypting
+        """
+        if not self.decrypting:
+            self.gcm.finalize()
+            return self.gcm.tag
+        if len(self.pending) != tag_length:
+            raise ValueError("Invalid ciphertext length. The ciphertext is missing its tag.")
+        self.gcm.finalize(self.pending)
+        return b""
+
+def create_stream(cipher, mode, key, iv, decrypting, workers=1):
+    """
+    Creates the streaming encryptor or decryptor for a cipher and mode.
+
+    Parameters:
+    - cipher: "aes" or "des"
+    - mode: "ecb", "cbc", "ctr" or "gcm" (AES only)
+    - key: the key as bytes
+    - iv: the IV or nonce, None for ECB
+    - decrypting: True to decrypt instead of encrypting
+    - workers: the number of worker processes for AES CTR and GCM
+
+    Raises:
+    - ValueError: Raises the exception if the combination is not supported or the key is not valid
+
+    Returns:
+    - An object with update() and finalize() methods
+    """
+    if mode == "gcm":
+        if cipher != "aes":
+            raise ValueError("GCM mode is only available with AES.")
+        return GCMStream(key, iv, decrypting, workers)
+    if mode == "ctr" and cipher == "aes":
+        return AES.AESCTR(key, iv, workers=workers)
+
+    block_size, encrypt, decrypt = cipher_functions(cipher, key)
+    if mode == "ctr":
+        return CounterModeStream(block_size, encrypt, iv)
+    return BlockModeStream(block_size, encrypt, decrypt, mode, iv, decrypting)
+
+def read_chunks(source, chunk_size):
+    """
+    Reads the input in pieces. Regular files are memory-mapped, anything else is read in chunks.
+
+    Parameters:
+    - source: an open binary file
+    - chunk_size: the size of each piece
+
+    Returns:
+    - A generator of bytes-like pieces
+    """
+    try:
+        info = os.fstat(source.fileno())
+        regular_file = stat.S_ISREG(info.st_mode) and info.st_size > 0
+    except (OSError, ValueError):
+        regular_file = False
+
+    if regular_file:
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, len(mapped), chunk_size):
+                yield mapped[offset:offset + chunk_size] # Copies only one chunk at a time
+        return
+
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def read_exactly(chunks, length, first=b""):
+    """
+    Takes a fixed number of bytes from the start of a chunk generator.
+
+    Parameters:
+    - chunks: the generator of pieces
+    - length: the number of bytes to take
+    - first: bytes already taken from the generator
+
+    Raises:
+    - ValueError: Raises the exception if the input is too short
+
+    Returns:
+    - The bytes taken and the rest of the first piece they came from
+    """
+    header = bytes(first)
+    while len(header) < length:
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("The input is too short to hold the IV.")
+        header += bytes(chunk)
+    return header[:length], header[length:]
+
+def run(cipher, mode, key, iv, decrypting, source, destination, chunk_size=default_chunk_size, workers=1):
+    """
+    Encrypts or decrypts everything from source into destination with a bounded amount of memory.
+
+    When no IV is given, encryption writes a random IV in front of the output and decryption
+    reads it from the front of the input.
+
+    Parameters:
+    - cipher: "aes" or "des"
+    - mode: "ecb", "cbc", "ctr" or "gcm"
+    - key: the key as bytes
+    - iv: the IV or nonce as bytes, or None
+    - decrypting: True to decrypt instead of encrypting
+    - source: the open binary input file
+    - destination: the open binary output file
+    - chunk_size: the size of the pieces the input is processed in
+    - workers: the number of worker processes for AES CTR and GCM
+
+    Raises:
+    - ValueError: Raises the exception if the key, the IV or the input are not valid
+
+    Returns:
+    - The number of input bytes processed
+    """
+    cipher_functions(cipher, key) # Check the key before anything is written
+    chunks = read_chunks(source, chunk_size)
+    processed = 0
+    leftover = b""
+
+    iv_length = iv_lengths.get((cipher, mode), 0)
+    if iv_length:
+        if iv is None:
+            if decrypting:
+                iv, leftover = read_exactly(chunks, iv_length)
+                processed += iv_length
+            else:
+                iv = os.urandom(iv_length)
+                destination.write(iv)
+        elif len(iv) != iv_length:
+            raise ValueError(f"Invalid IV length. The IV must be {iv_length} bytes for {cipher.upper()}-{mode.upper()}.")
+
+    stream = create_stream(cipher, mode, key, iv, decrypting, workers)
+    if leftover:
+        destination.write(stream.update(leftover))
+        processed += len(leftover)
+    for chunk in chunks:
+        destination.write(stream.update(chunk))
+        processed += len(chunk)
+    destination.write(stream.finalize())
+    return processed
+
+def positive_int(value):
+    """
+    Parses a command-line value that must be a positive integer.
+
+    Parameters:
+    - value: the value as given on the command line
+
+    Raises:
+    - argparse.ArgumentTypeError: Raises the exception if the value is not an integer above 0
+
+    Returns:
+    - The integer
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a positive integer")
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt files with AES or DES.")
+    parser.add_argument("action", choices=["encrypt", "decrypt"])
+    parser.add_argument("--cipher", choices=["aes", "des"], default="aes", help="des uses DES with an 8-byte key or Triple DES with a 16- or 24-byte key")
+    parser.add_argument("--mode", choices=["ecb", "cbc", "ctr", "gcm"], default="ctr")
+    parser.add_argument("--key", required=True, help="the key in hexadecimal")
+    parser.add_argument("--iv", help="the IV or nonce in hexadecimal, by default a random one is stored in front of the output")
+    parser.add_argument("-i", "--input", default="-", help="the input file, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="the output file, - for stdout")
+    parser.add_argument("--chunk-size", type=positive_int, default=default_chunk_size, help="the size of the pieces the input is read in")
+    parser.add_argument("--workers", type=int, default=1, help="the number of worker processes for AES CTR and GCM")
+    parser.add_argument("--stats", action="store_true", help="print the throughput to stderr")
+    args = parser.parse_args()
+
+    try:
+        key = bytes.fromhex(args.key)
+        iv = bytes.fromhex(args.iv) if args.iv else None
+    except ValueError:
+        parser.error("The key and the IV must be hexadecimal.")
+    try:
+        cipher_functions(args.cipher, key)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if (args.input != "-" and args.output != "-" and os.path.exists(args.input) and os.path.exists(args.output)
+            and os.path.samefile(args.input, args.output)):
+        parser.error("The input and the output must be different files.")
+    decrypting = args.action == "decrypt"
+
+    # The output goes to a temporary file that only replaces the output file once everything succeeded,
+    # so a failure never leaves partial or unauthenticated output behind
+    temporary_path = None
+    if args.output != "-":
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(args.output)),
+                                                      prefix=".file_cipher-")
+        destination = os.fdopen(descriptor, "wb")
+    elif args.mode == "gcm" and decrypting:
+        destination = tempfile.TemporaryFile() # Held back until the tag is checked, as stdout cannot be taken back
+    else:
+        destination = sys.stdout.buffer
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    start_time = time.perf_counter()
+    try:
+        processed = run(args.cipher, args.mode, key, iv, decrypting, source, destination,
+                        args.chunk_size, args.workers)
+        if temporary_path is not None:
+            destination.close()
+            os.replace(temporary_path, args.output)
+        elif destination is not sys.stdout.buffer:
+            destination.seek(0)
+            shutil.copyfileobj(destination, sys.stdout.buffer)
+    except BaseException as error:
+        if temporary_path is not None:
+            destination.close()
+            os.remove(temporary_path)
+        if isinstance(error, ValueError):
+            sys.exit(f"Error: {error}")
+        raise
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if destination is not sys.stdout.buffer and not destination.closed:
+            destination.close()
+    elapsed = time.perf_counter() - start_time
+
+    if args.stats:
+        rate = processed / elapsed if elapsed else 0.0
+        print(f"Processed {processed} bytes in {elapsed:.2f}s ({rate:,.0f} bytes/sec)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,84 @@
-import random
+import io
+import os
+import threading
+from LFSR import LFSR, lfsr
+from LFSRGenerators import geffe_generator, majority_generator, shrinking_generator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None # xor_stream falls back to plain integers
+
+# Number of bytes XORed at once by xor_stream
+xor_chunk_size = 1 << 16
+
+# Number of random bytes fetched from the operating system on every refill of a KeystreamPool
+keystream_refill_size = 1 << 16
+
+# Counts the forks this process comes from, so pools can drop the bytes they share with the parent
+fork_generation = 0
+
+def count_fork():
+    """
+    Runs in every child process after a fork.
+    """
+    global fork_generation
+    fork_generation += 1
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=count_fork)
+
+class KeystreamPool:
+    """
+    Thread-safe pool of random bytes from os.urandom. The bytes are fetched in large refills and
+    handed out as slices, so many small requests share one system call. Requests at least as
+    large as a refill go straight to os.urandom.
+
+    Parameters:
+    - refill_size: the number of bytes fetched on every refill
+    """
+    def __init__(self, refill_size=keystream_refill_size):
+        self.refill_size = refill_size
+        self.buffer = b""
+        self.position = 0
+        self.generation = fork_generation
+        self.lock = threading.Lock()
+
+    def read(self, size):
+        """
+        Takes random bytes from the pool.
+
+        Parameters:
+        - size: the number of bytes
+
+        Raises:
+        - ValueError: Raises the exception if the size is negative
+
+        Returns:
+        - The random bytes
+        """
+        if size < 0:
+            raise ValueError("The number of random bytes must not be negative.")
+        if size >= self.refill_size:
+            return os.urandom(size)
+        with self.lock:
+            if self.generation != fork_generation:
+                # A forked child must never hand out the same bytes as its parent
+                self.buffer = b""
+                self.position = 0
+                self.generation = fork_generation
+            if len(self.buffer) - self.position < size:
+                self.buffer = self.buffer[self.position:] + os.urandom(self.refill_size)
+                self.position = 0
+            chunk = self.buffer[self.position:self.position + size]
+            self.position += size
+            return chunk
+
+# The pool shared by generate_key and the rest of the module
+keystream_pool = KeystreamPool()
+
+# Number of bytes read from the input at a time by the streaming pipeline
+stream_chunk_size = 1 << 16
 
 def generate_key(length):
     """
@@ -10,7 +90,10 @@ def generate_key(length):
     Returns:
     - A string of random 1's and 0's representing the generated key
     """
-    key = ''.join(random.choice('01') for _ in range(length)) # Selects 1 or 0 at random to generate the key that is the same length as the plaintext provided.
+    if length <= 0:
+        return ''
+    random_bytes = keystream_pool.read((length + 7) // 8) # Eight key bits from every random byte
+    key = format(int.from_bytes(random_bytes, "big"), f'0{8 * len(random_bytes)}b')[:length]
     return key
 
 def text_to_binary(text):
@@ -37,12 +120,12 @@ def encrypt_message(message, key):
     Returns:
     - The encrypted ciphertext message
     """
-    encrypted_message = '' # Initialize an empty string
+    encrypted_chars = [] # Collect the characters and join them once at the end
     for i in range(len(message)):
         key_index = i % len(key)
         encrypted_char = chr(ord(message[i]) ^ ord(key[key_index]))
-        encrypted_message += encrypted_char
-    return encrypted_message # Return the encrypted message after being XORed with the key
+        encrypted_chars.append(encrypted_char)
+    return ''.join(encrypted_chars) # Return the encrypted message after being XORed with the key
 
 def decrypt_message(encrypted_message, key):
     """
@@ -55,12 +138,313 @@ def decrypt_message(encrypted_message, key):
     Returns:
     - The decrypted plaintext message
     """
-    decrypted_message = '' # Initialize an empty string
+    decrypted_chars = [] # Collect the characters and join them once at the end
     for i in range(len(encrypted_message)):
         key_index = i % len(key)
         decrypted_char = chr(ord(encrypted_message[i]) ^ ord(key[key_index]))
-        decrypted_message += decrypted_char
-    return decrypted_message # Return the decrypted message after being XORed with key key
+        decrypted_chars.append(decrypted_char)
+    return ''.join(decrypted_chars) # Return the decrypted message after being XORed with key key
+
+def xor_stream(data, keystream, out=None, use_numpy=None, repeat=False):
+    """
+    XORs bytes with a keystream a wide slice at a time, which both encrypts and decrypts. A
+    keystream shorter than the data is only repeated, as encrypt_message does, when repeat is
+    True, since reusing a keystream turns it into a many-time pad.
+
+    Parameters:
+    - data: any bytes-like object
+    - keystream: the keystream as a bytes-like object
+    - out: optional writable buffer of the same length to write the result into, it may be data itself
+    - use_numpy: True or False to choose the NumPy or the integer path, by default NumPy is used when it is installed
+    - repeat: True to repeat a keystream shorter than the data
+
+    Raises:
+    - ValueError: Raises the exception if the keystream is too short (or empty when repeating) or out has the wrong length
+
+    Returns:
+    - The buffer holding the result, which is out when it is given
+    """
+    source = memoryview(data).cast("B")
+    key = memoryview(keystream).cast("B")
+    length = len(source)
+    if out is None:
+        out = bytearray(length)
+    destination = memoryview(out).cast("B")
+    if len(destination) != length:
+        raise ValueError("Invalid output length. The output must be the same length as the data.")
+    if not length:
+        return out
+    if len(key) < length and not repeat:
+        raise ValueError("The keystream is shorter than the data. Pass repeat=True to reuse it.")
+    if not len(key):
+        raise ValueError("The keystream must not be empty.")
+
+    chunk_size = xor_chunk_size
+    repeating = len(key) < length
+    if repeating:
+        # Repeat the keystream over a whole chunk, so every chunk starts at the start of the keystream
+        chunk_size = max(len(key), chunk_size - chunk_size % len(key))
+        key = memoryview(bytes(key) * (chunk_size // len(key)))
+
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    for offset in range(0, length, chunk_size):
+        end = min(offset + chunk_size, length)
+        key_slice = key[:end - offset] if repeating else key[offset:end]
+        if use_numpy:
+            numpy.bitwise_xor(numpy.frombuffer(source[offset:end], numpy.uint8), numpy.frombuffer(key_slice, numpy.uint8),
+                              out=numpy.frombuffer(destination[offset:end], numpy.uint8))
+        else:
+            value = int.from_bytes(source[offset:end], "big") ^ int.from_bytes(key_slice, "big")
+            destination[offset:end] = value.to_bytes(end - offset, "big")
+    return out
+
+class BitStringSource:
+    """
+    Keystream source that packs the '0'/'1' strings of a bit generator into bytes, the first bit
+    being the most significant bit of each byte, like text_to_binary.
+
+    Parameters:
+    - next_bits: function that returns the next given number of bits as a '0'/'1' string
+    """
+    def __init__(self, next_bits):
+        self.next_bits = next_bits
+        self.pending = '' # Bits generated but not handed out yet
+
+    def read(self, size):
+        """
+        Takes the next keystream bytes.
+
+        Parameters:
+        - size: the number of bytes
+
+        Returns:
+        - The keystream bytes
+        """
+        needed = 8 * size - len(self.pending)
+        bits = self.pending + (self.next_bits(needed) if needed > 0 else '')
+        self.pending = bits[8 * size:]
+        return int(bits[:8 * size], 2).to_bytes(size, "big") if size else b""
+
+def lfsr_keystream_source(initial_state, polynomial_degree):
+    """
+    Creates a keystream source from the LFSR in LFSR.py, carrying on from where the previous read stopped.
+
+    Parameters:
+    - initial_state: the initial state of the bits as a '0'/'1' string
+    - polynomial_degree: the degree of the polynomial
+
+    Returns:
+    - A keystream source
+    """
+    state = initial_state
+    length = len(initial_state)
+
+    def next_bits(count):
+        nonlocal state
+        # After c cycles the register holds output bits c to c + length - 1 in reverse, so running
+        # length - 1 extra cycles gives the state to carry on from
+        bits = lfsr(state, polynomial_degree, count + length - 1)
+        state = bits[count - 1:][::-1]
+        return bits[:count]
+
+    return BitStringSource(next_bits)
+
+class AESCTRKeystreamSource:
+    """
+    Keystream source made of AES blocks in counter mode.
+
+    Parameters:
+    - key: the AES key
+    - counter: the initial counter block, as 16 bytes or as an integer
+    """
+    def __init__(self, key, counter):
+        import AES # Only loaded when this source is used
+        self.ctr = AES.AESCTR(key, counter, workers=1)
+
+    def read(self, size):
+        """
+        Takes the next keystream bytes.
+
+        Parameters:
+        - size: the number of bytes
+
+        Returns:
+        - The keystream bytes
+        """
+        return bytes(self.ctr.update(bytes(size)))
+
+class OneTimePadSource:
+    """
+    Keystream source of fresh random bytes, a one-time pad. The pad cannot be generated again, so
+    every byte handed out is also written to the pad given by the caller, for PadReplaySource to
+    decrypt with.
+
+    Parameters:
+    - pad: the writable binary file or bytearray that records the pad
+    - pool: the KeystreamPool to draw from, by default the shared one
+    """
+    def __init__(self, pad, pool=None):
+        self.record = pad.write if hasattr(pad, "write") else pad.extend
+        self.pool = pool or keystream_pool
+
+    def read(self, size):
+        """
+        Takes the next pad bytes and records them.
+
+        Parameters:
+        - size: the number of bytes
+
+        Returns:
+        - The pad bytes
+        """
+        keystream = self.pool.read(size)
+        self.record(keystream)
+        return keystream
+
+class PadReplaySource:
+    """
+    Keystream source that reads back a pad recorded by OneTimePadSource.
+
+    Parameters:
+    - pad: the readable binary file, or the bytes-like object, holding the pad
+    """
+    def __init__(self, pad):
+        self.pad = pad if hasattr(pad, "read") else io.BytesIO(pad)
+
+    def read(self, size):
+        """
+        Takes the next pad bytes.
+
+        Parameters:
+        - size: the number of bytes
+
+        Raises:
+        - ValueError: Raises the exception if the pad is shorter than the data
+
+        Returns:
+        - The pad bytes
+        """
+        keystream = self.pad.read(size)
+        if len(keystream) != size:
+            raise ValueError("The pad is shorter than the data.")
+        return keystream
+
+# The available keystream sources by name, each as a function creating a source with a read(size) method
+keystream_sources = {
+    "csprng": OneTimePadSource,
+    "pad": PadReplaySource,
+    "lfsr": lfsr_keystream_source,
+    "lfsr-int": LFSR,
+    "geffe": geffe_generator,
+    "shrinking": shrinking_generator,
+    "majority": majority_generator,
+    "aes-ctr": AESCTRKeystreamSource,
+}
+
+def register_keystream_source(name, factory):
+    """
+    Adds a keystream source that encrypt_stream can create by name.
+
+    Parameters:
+    - name: the name of the source
+    - factory: function taking the options of the source and returning an object with a read(size) method
+    """
+    keystream_sources[name] = factory
+
+def create_keystream_source(name, **options):
+    """
+    Creates a registered keystream source.
+
+    Parameters:
+    - name: the name of the source
+    - options: the options for the source, such as the key
+
+    Raises:
+    - ValueError: Raises the exception if no source has that name
+
+    Returns:
+    - The keystream source
+    """
+    if name not in keystream_sources:
+        raise ValueError(f"Unknown keystream source '{name}'. Available sources: {', '.join(sorted(keystream_sources))}.")
+    return keystream_sources[name](**options)
+
+def read_chunks(file, chunk_size=stream_chunk_size):
+    """
+    Reads a binary file in chunks.
+
+    Parameters:
+    - file: the open binary file
+    - chunk_size: the size of each chunk
+
+    Returns:
+    - A generator of chunks
+    """
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def encrypt_stream(chunks, source, **options):
+    """
+    Encrypts a stream of chunks lazily: each chunk is XORed with the next piece of the keystream
+    and yielded, so only one chunk is in memory at a time.
+
+    Parameters:
+    - chunks: an iterable of bytes-like chunks, such as read_chunks(file)
+    - source: a keystream source, or the name of a registered one
+    - options: the options to create the source when a name is given
+
+    Returns:
+    - A generator of encrypted chunks
+    """
+    if isinstance(source, str):
+        source = create_keystream_source(source, **options)
+    for chunk in chunks:
+        if len(chunk):
+            yield bytes(xor_stream(chunk, source.read(len(chunk))))
+
+def decrypt_stream(chunks, source, **options):
+    """
+    Decrypts a stream of chunks lazily, which is the same XOR as encrypt_stream with a source in the same state.
+
+    Parameters:
+    - chunks: an iterable of bytes-like chunks
+    - source: a keystream source, or the name of a registered one
+    - options: the options to create the source when a name is given
+
+    Returns:
+    - A generator of decrypted chunks
+    """
+    return encrypt_stream(chunks, source, **options)
+
+async def encrypt_stream_async(reader, writer, source, chunk_size=stream_chunk_size, **options):
+    """
+    Encrypts (or decrypts) everything from an asyncio StreamReader into a StreamWriter, such as the
+    two ends of a socket connection, waiting for the writer to drain after every chunk.
+
+    Parameters:
+    - reader: the asyncio.StreamReader to read from
+    - writer: the asyncio.StreamWriter to write to
+    - source: a keystream source, or the name of a registered one
+    - chunk_size: the largest chunk read at a time
+    - options: the options to create the source when a name is given
+
+    Returns:
+    - The number of bytes processed
+    """
+    if isinstance(source, str):
+        source = create_keystream_source(source, **options)
+    processed = 0
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            return processed
+        writer.write(xor_stream(chunk, source.read(len(chunk))))
+        await writer.drain()
+        processed += len(chunk)
 
 def main():
     # Example plaintext message 
@@ -79,6 +463,17 @@ def main():
     # Decrypt the encrypted message
     decrypted_message = decrypt_message(encrypted_message, key)
     print("Decrypted message:", decrypted_message)
+
+    # Encrypt the message as bytes with a random keystream
+    keystream = keystream_pool.read(len(plaintext_message))
+    encrypted_bytes = xor_stream(plaintext_message.encode(), keystream)
+    print("Decrypted bytes:", bytes(xor_stream(encrypted_bytes, keystream)).decode())
+
+    # Encrypt the message chunk by chunk with an LFSR keystream
+    chunks = [plaintext_message[:5].encode(), plaintext_message[5:].encode()]
+    encrypted_chunks = list(encrypt_stream(chunks, "lfsr", initial_state="1011010", polynomial_degree=5))
+    decrypted_chunks = decrypt_stream(encrypted_chunks, "lfsr", initial_state="1011010", polynomial_degree=5)
+    print("Decrypted stream:", b"".join(decrypted_chunks).decode())
     
 if __name__ == "__main__":
     main()
\ No newline at end of file